@@ -1,12 +1,21 @@
+from typing import Optional
+
 import streamlit as st
-from questions import QUESTIONS
-from src.auth.auth import authenticate_user
+from src.auth.auth import (
+    authenticate_user,
+    cache_session,
+    get_cached_session,
+    issue_session_token,
+    verify_session_token,
+)
 from src.data.storage import (
     save_answer,
-    get_user_answers,
-    get_last_answered_question,
+    get_answers,
+    get_answer_save_error,
+    save_draft,
+    flush_drafts,
     save_playground_interaction,
-    get_playground_interactions,
+    get_playground_usage,
 )
 from src.ui.components import (
     display_question,
@@ -14,11 +23,31 @@ from src.ui.components import (
     display_progress,
     display_answer_history,
     display_playground_history,
+    display_trace_panel,
 )
-from src.ai.playground import get_ai_response
+from src.ai.playground import (
+    AIStreamError,
+    compare_ai_responses,
+    stream_ai_response,
+)
+from src import tracing
+from src.config import ADMIN_EMAILS, MODELS
+from src.catalog import CATALOG
+from src.session import load_session
+
+NO_AI = "No AI Assistance"
+COMPARE = "Compare models"
+# Query parameter holding the signed session token
+SESSION_PARAM = "session"
 
 
 def main():
+    # Group every storage and AI span of this script run under one rerun
+    with tracing.rerun(user=st.session_state.get("user_email")):
+        render()
+
+
+def render():
     # Initialize session state
     if "current_question" not in st.session_state:
         st.session_state.current_question = 0
@@ -26,15 +55,17 @@ def main():
         st.session_state.is_authenticated = False
         st.session_state.user_email = None
 
-    # Authentication - only show if not authenticated
-    if not st.session_state.is_authenticated:
+    # Authentication - only show if not authenticated and the URL holds no
+    # valid session token
+    if not st.session_state.is_authenticated and not restore_session():
         email = st.text_input("Enter your email address:")
         password = st.text_input("Enter password:", type="password")
 
         is_authenticated, auth_message = authenticate_user(email, password)
         if is_authenticated:
-            st.session_state.is_authenticated = True
-            st.session_state.user_email = email
+            token = issue_session_token(email)
+            start_session(email, token)
+            st.experimental_set_query_params(**{SESSION_PARAM: token})
             st.rerun()  # Rerun to refresh the page without login fields
         else:
             st.warning(auth_message)
@@ -42,6 +73,10 @@ def main():
 
     # Use stored email for all subsequent operations
     email = st.session_state.user_email
+    # Keep the server-side copy current, so a reload resumes here
+    st.session_state.server_session["current_question"] = (
+        st.session_state.current_question
+    )
 
     # AI Settings in sidebar
     with st.sidebar:
@@ -49,13 +84,20 @@ def main():
         # AI assistance selector
         ai_assistance = st.radio(
             "Select AI Assistance Level:",
-            ["No AI Assistance", "GPT-3.5-turbo", "GPT-4o"],
+            [NO_AI, *MODELS, COMPARE],
             key=f"ai_assistance_{st.session_state.current_question}",
         )
 
         # AI Playground
-        if ai_assistance != "No AI Assistance":
+        if ai_assistance != NO_AI:
             st.markdown("### AI Playground")
+            if ai_assistance == COMPARE:
+                compare_models = st.multiselect(
+                    "Models to compare:",
+                    list(MODELS),
+                    default=list(MODELS),
+                    key=f"compare_models_{st.session_state.current_question}",
+                )
             prompt = st.text_area(
                 "Enter your prompt:",
                 height=100,
@@ -66,33 +108,64 @@ def main():
             if st.button("Run", key=f"run_{st.session_state.current_question}"):
                 if not prompt.strip():
                     st.error("Please enter a prompt")
+                elif ai_assistance == COMPARE:
+                    if compare_models:
+                        run_comparison(email, prompt, compare_models)
+                    else:
+                        st.error("Please select at least one model")
                 else:
+                    st.markdown("### Response:")
+                    # Clicking Stop reruns the script, which interrupts the
+                    # loop below; the stream is closed in the finally block
+                    st.button("Stop", key=f"stop_{st.session_state.current_question}")
+                    placeholder = st.empty()
+                    stream = stream_ai_response(prompt, ai_assistance)
                     try:
-                        response_text, parameters = get_ai_response(
-                            prompt, ai_assistance
-                        )
-                        st.markdown("### Response:")
-                        st.write(response_text)
+                        for _ in stream:
+                            placeholder.markdown(stream.text + "▌")
+                        placeholder.markdown(stream.text)
 
                         save_playground_interaction(
                             email,
                             st.session_state.current_question,
                             prompt,
-                            parameters,
-                            response_text,
+                            stream.parameters,
+                            stream.text,
+                            stream.telemetry,
                         )
+                    except AIStreamError as e:
+                        placeholder.markdown(e.partial_text)
+                        st.error(f"Error: {str(e)}")
                     except Exception as e:
                         st.error(f"Error: {str(e)}")
+                    finally:
+                        stream.close()
+
+            with st.expander("Your playground history"):
+                # Built in the background at login; rebuilt from the compacted
+                # log if evicted since
+                try:
+                    display_playground_history(get_playground_usage(email))
+                except Exception as e:
+                    st.error(f"Error loading playground history: {str(e)}")
 
     # Main content
     st.title("Berkeley Haas: AI For Business Leaders (EWMBA295T.6)")
 
-    # Get the last answered question for this user
-    last_answered = get_last_answered_question(email)
+    # Index of this user's answers by question number, served from the
+    # backend's cache that load_session warmed
+    answers = get_answers(email)
+    last_answered = max(answers, default=-1)
+    save_error = get_answer_save_error(email)
+    if save_error:
+        st.error(
+            "Some of your answers have not been saved yet; we keep retrying. "
+            f"Please keep this page open. ({save_error})"
+        )
 
     # Navigation
     nav_action = display_navigation(
-        st.session_state.current_question, len(QUESTIONS), last_answered
+        st.session_state.current_question, len(CATALOG), last_answered
     )
     if nav_action == "previous":
         st.session_state.current_question -= 1
@@ -102,64 +175,146 @@ def main():
         st.rerun()
 
     # Display current question
-    current_question = QUESTIONS[st.session_state.current_question]
+    current_question = CATALOG[st.session_state.current_question]
     display_question(current_question)
 
-    # Get existing answer if any
-    existing_answers = get_user_answers(email)
-    current_answer = ""
-    if not existing_answers.empty:
-        answer_row = existing_answers[
-            existing_answers["question_number"] == st.session_state.current_question
-        ]
-        if not answer_row.empty:
-            current_answer = answer_row.iloc[0]["answer"]
-
-    # Answer input
+    # Get existing answer if any, or a newer unsubmitted draft
+    existing_answer = answers.get(st.session_state.current_question)
+    draft = st.session_state.drafts.get(st.session_state.current_question)
+    if draft and (
+        not existing_answer or draft.updated_at > existing_answer.submitted_at
+    ):
+        current_answer = draft.text
+    else:
+        current_answer = existing_answer.answer if existing_answer else ""
+
+    # Answer input; edits are autosaved as drafts when the text area loses focus
     answer = st.text_area(
         "Your Answer:",
         value=current_answer,
         height=200,
         key=f"answer_input_{st.session_state.current_question}",
+        on_change=autosave_draft,
+        args=(email, st.session_state.current_question),
     )
 
     if st.button("Submit Answer"):
         if answer.strip():
             if st.session_state.current_question <= last_answered + 1:
-                save_answer(email, st.session_state.current_question, answer)
-                st.success("Answer submitted successfully!")
-
-                # Check if this was the last question
-                if st.session_state.current_question == len(QUESTIONS) - 1:
-                    st.balloons()  # Add a celebratory effect
-                    st.success(
-                        "🎉 Congratulations! You have completed all questions. Thank you for your participation!"
-                    )
-                # If not the last question, proceed as before
-                elif st.session_state.current_question < len(QUESTIONS) - 1:
-                    if (
-                        f"answer_input_{st.session_state.current_question + 1}"
-                        in st.session_state
-                    ):
-                        del st.session_state[
+                try:
+                    save_answer(email, st.session_state.current_question, answer)
+                except Exception as e:
+                    st.error(f"Error saving answer: {str(e)}")
+                else:
+                    flush_drafts(email, st.session_state.current_question)
+                    st.success("Answer submitted successfully!")
+
+                    # Check if this was the last question
+                    if st.session_state.current_question == len(CATALOG) - 1:
+                        st.balloons()  # Add a celebratory effect
+                        st.success(
+                            "🎉 Congratulations! You have completed all questions. Thank you for your participation!"
+                        )
+                    # If not the last question, proceed as before
+                    elif st.session_state.current_question < len(CATALOG) - 1:
+                        if (
                             f"answer_input_{st.session_state.current_question + 1}"
-                        ]
-                    if (
-                        f"prompt_{st.session_state.current_question + 1}"
-                        in st.session_state
-                    ):
-                        del st.session_state[
+                            in st.session_state
+                        ):
+                            del st.session_state[
+                                f"answer_input_{st.session_state.current_question + 1}"
+                            ]
+                        if (
                             f"prompt_{st.session_state.current_question + 1}"
-                        ]
-                    st.session_state.current_question += 1
-                    st.rerun()
+                            in st.session_state
+                        ):
+                            del st.session_state[
+                                f"prompt_{st.session_state.current_question + 1}"
+                            ]
+                        st.session_state.current_question += 1
+                        st.rerun()
             else:
                 st.error("Please answer the questions in order.")
         else:
             st.error("Please provide an answer before submitting.")
 
     # Show progress
-    display_progress(last_answered, len(QUESTIONS))
+    display_progress(last_answered, len(CATALOG))
+
+    if tracing.enabled() and email.lower() in ADMIN_EMAILS:
+        with st.sidebar:
+            display_trace_panel(tracing.recent_reruns(), tracing.totals())
+
+
+def start_session(email: str, token: str, state: Optional[dict] = None) -> None:
+    """Sign the user in with the state cached for their token, or load it."""
+    if state is None:
+        # Load everything the first screen needs in one concurrent step
+        session = load_session(email)
+        state = {
+            "current_question": session.resume_question,
+            "drafts": session.drafts,
+        }
+        cache_session(token, state)
+    st.session_state.update(state)
+    st.session_state.is_authenticated = True
+    st.session_state.user_email = email
+    st.session_state.server_session = state
+
+
+def restore_session() -> bool:
+    """Resume from the session token in the URL, e.g. after a page reload."""
+    token = st.experimental_get_query_params().get(SESSION_PARAM, [None])[0]
+    email = verify_session_token(token) if token else None
+    if email is None:
+        return False
+    # The state is gone if the server restarted since; it is loaded again
+    start_session(email, token, get_cached_session(token))
+    return True
+
+
+def autosave_draft(email: str, question_number: int) -> None:
+    """Keep the answer being typed as a draft, in storage and in this session."""
+    text = st.session_state.get(f"answer_input_{question_number}")
+    # The widget's state is gone if a rerun already moved to another question
+    if text is not None:
+        st.session_state.drafts[question_number] = save_draft(
+            email, question_number, text
+        )
+
+
+def run_comparison(email: str, prompt: str, labels: list[str]) -> None:
+    """Stream one prompt from several models side by side and log each result."""
+    st.markdown("### Responses:")
+    # As with a single model, Stop reruns the script and interrupts the loop
+    st.button("Stop", key=f"stop_{st.session_state.current_question}")
+    placeholders = []
+    for column, label in zip(st.columns(len(labels)), labels):
+        column.markdown(f"**{label}**")
+        placeholders.append(column.empty())
+
+    comparison = compare_ai_responses(prompt, labels)
+    try:
+        for index in comparison:
+            placeholders[index].markdown(comparison.results[index].text + "▌")
+    finally:
+        comparison.close()
+
+    for placeholder, result in zip(placeholders, comparison.results):
+        if result.error:
+            with placeholder.container():
+                st.markdown(result.text)
+                st.error(result.error)
+            continue
+        placeholder.markdown(result.text)
+        save_playground_interaction(
+            email,
+            st.session_state.current_question,
+            prompt,
+            result.parameters,
+            result.text,
+            result.telemetry,
+        )
 
 
 if __name__ == "__main__":
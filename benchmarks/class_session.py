@@ -0,0 +1,295 @@
+"""
+Simulate a class working through the questions at the same time.
+
+Each student is driven through app.py with Streamlit's AppTest: log in, then
+for every question pick a model, run a playground prompt and submit an
+answer. S3 and OpenAI are replaced with local stand-ins whose latency is
+configurable. Every script run (a rerun in Streamlit terms) is timed.
+
+    python -m benchmarks.class_session --students 80 --output bench.jsonl
+
+With --output, one JSON line per run is appended so numbers can be compared
+across changes to storage.py and app.py. If any session fails part way, the
+result still reports it but the command exits with status 1.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from urllib import parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "benchmark"
+
+# Configuration is read at import time, so set it before importing the app
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ["PASSWORD"] = PASSWORD
+os.environ.setdefault(
+    "DRAFT_JOURNAL_PATH", os.path.join(tempfile.mkdtemp(), "drafts.jsonl")
+)
+sys.path.insert(0, ROOT)
+
+from streamlit.runtime import Runtime  # noqa: E402
+from streamlit.runtime.caching.storage.dummy_cache_storage import (  # noqa: E402
+    MemoryCacheStorageManager,
+)
+from streamlit.runtime.media_file_manager import MediaFileManager  # noqa: E402
+from streamlit.runtime.memory_media_file_storage import (  # noqa: E402
+    MemoryMediaFileStorage,
+)
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent  # noqa: E402
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1.element_tree import Block  # noqa: E402
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner  # noqa: E402
+
+from questions import QUESTIONS  # noqa: E402
+from src.clients import set_async_openai_client, set_openai_client  # noqa: E402
+from src.data.backends import set_backend  # noqa: E402
+from src.data.backends.s3 import S3Backend  # noqa: E402
+
+from .stubs import LocalAsyncOpenAI, LocalOpenAI, LocalS3  # noqa: E402
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _prune_stale_widgets(block: Block) -> None:
+    """
+    Drop widgets that only existed before an st.rerun() in the same run.
+    The message queue keeps them in the tree even though their state is gone,
+    which would make the next run fail; a browser never shows them.
+    """
+    for index, child in list(block.children.items()):
+        if isinstance(child, Block):
+            _prune_stale_widgets(child)
+            continue
+        try:
+            child.value
+        except KeyError:
+            del block.children[index]
+        except Exception:
+            pass
+
+
+class ConcurrentAppTest(AppTest):
+    """
+    AppTest that can run in many threads at once.
+    AppTest.run installs and then clears a process-global mock Runtime around
+    every script run, so concurrent sessions tear each other's runtime down.
+    This variant installs one shared runtime instead (Streamlit 1.29). Like a
+    real server, every session also shares one compiled copy of the script:
+    compiling app.py in several threads at once intermittently fails on
+    Python 3.11 ("AST constructor recursion depth mismatch"), which AppTest
+    reports as an empty page. It also prunes widgets left over from before an
+    st.rerun().
+    """
+
+    _setup_lock = threading.Lock()
+    _script_cache = ScriptCache()
+
+    def _run(self, widget_state=None, timeout=None):
+        with self._setup_lock:
+            if Runtime._instance is None:
+                runtime = MagicMock(spec=Runtime)
+                runtime.media_file_mgr = MediaFileManager(
+                    MemoryMediaFileStorage("/mock/media")
+                )
+                runtime.cache_storage_manager = MemoryCacheStorageManager()
+                Runtime._instance = runtime
+
+        script_runner = LocalScriptRunner(self._script_path, self.session_state)
+        script_runner._script_cache = self._script_cache
+        self._tree = script_runner.run(
+            widget_state, self.query_params, timeout or self.default_timeout
+        )
+        for event, data in zip(script_runner.events, script_runner.event_data):
+            if event == ScriptRunnerEvent.SCRIPT_STOPPED_WITH_COMPILE_ERROR:
+                raise RuntimeError(f"Script failed to compile: {data['exception']}")
+        self._tree._runner = self
+        _prune_stale_widgets(self._tree)
+        query_string = script_runner.event_data[-1]["client_state"].query_string
+        self.query_params = parse.parse_qs(query_string)
+        return self
+
+
+class Student:
+    """One simulated browser session."""
+
+    def __init__(self, email: str, think_time: float, timeout: float):
+        self.email = email
+        self.think_time = think_time
+        # from_file() always builds a plain AppTest, so construct directly
+        self.app = ConcurrentAppTest(
+            os.path.join(ROOT, "app.py"), default_timeout=timeout
+        )
+        self.rerun_seconds: list[float] = []
+        self.errors: list[str] = []
+        self.completed = False
+
+    def _run(self) -> None:
+        start = time.perf_counter()
+        self.app.run()
+        self.rerun_seconds.append(time.perf_counter() - start)
+        if self.app.exception:
+            self.errors.extend(str(e.value) for e in self.app.exception)
+        if self.think_time:
+            time.sleep(random.uniform(0, 2 * self.think_time))
+
+    def _button(self, label: str):
+        return next(button for button in self.app.button if button.label == label)
+
+    def session(self, models: list[str]) -> None:
+        self._run()
+        self.app.text_input[0].input(self.email)
+        self.app.text_input[1].input(PASSWORD)
+        self._run()
+
+        for question in range(len(QUESTIONS)):
+            self.app.sidebar.radio[0].set_value(random.choice(models))
+            self._run()
+
+            self.app.sidebar.text_area[0].input(QUESTIONS[question][:500])
+            self.app.button(key=f"run_{question}").click()
+            self._run()
+
+            self.app.text_area(key=f"answer_input_{question}").input(
+                f"Answer to question {question + 1} from {self.email}"
+            )
+            self._button("Submit Answer").click()
+            self._run()
+        self.completed = True
+
+
+def run(args: argparse.Namespace) -> dict:
+    s3 = LocalS3(latency=args.s3_latency_ms / 1000)
+    llm = LocalOpenAI(
+        first_token_latency=args.llm_first_token_ms / 1000,
+        token_latency=args.llm_token_ms / 1000,
+        response_tokens=args.llm_tokens,
+    )
+    backend = S3Backend(client=s3, bucket="benchmark")
+    set_backend(backend)
+    set_openai_client(llm)
+    set_async_openai_client(LocalAsyncOpenAI(llm))
+
+    students = [
+        Student(f"student{i:03d}@berkeley.edu", args.think_ms / 1000, args.timeout)
+        for i in range(args.students)
+    ]
+    # With --compare every run streams from both models side by side
+    models = ["Compare models"] if args.compare else ["GPT-3.5-turbo", "GPT-4o"]
+
+    def drive(student: Student) -> None:
+        # Spread logins over the ramp-up window like a class arriving at 9:00
+        time.sleep(random.uniform(0, args.ramp_up))
+        try:
+            student.session(models)
+        except Exception as e:
+            student.errors.append(f"{type(e).__name__}: {e}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency or args.students) as pool:
+        list(pool.map(drive, students))
+    backend.flush(60)
+    elapsed = time.perf_counter() - started
+
+    reruns = [seconds for student in students for seconds in student.rerun_seconds]
+    bytes_per_user = [s3.bytes_by_user.get(s.email, 0) for s in students]
+    s3_calls = sum(s3.calls.values())
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "students": args.students,
+        "s3_latency_ms": args.s3_latency_ms,
+        "llm_first_token_ms": args.llm_first_token_ms,
+        "compare": args.compare,
+        "wall_seconds": round(elapsed, 3),
+        "reruns": len(reruns),
+        "rerun_p50_ms": round(percentile(reruns, 50) * 1000, 1),
+        "rerun_p95_ms": round(percentile(reruns, 95) * 1000, 1),
+        "rerun_p99_ms": round(percentile(reruns, 99) * 1000, 1),
+        "s3_calls": dict(s3.calls),
+        "s3_calls_per_rerun": round(s3_calls / max(1, len(reruns)), 3),
+        "bytes_per_user_mean": round(statistics.fmean(bytes_per_user), 1),
+        "bytes_per_user_max": max(bytes_per_user, default=0),
+        "llm_calls": llm.calls,
+        "sessions_completed": sum(student.completed for student in students),
+        "errors": sum(len(student.errors) for student in students),
+        "first_errors": [e for s in students for e in s.errors][:5],
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--students", type=int, default=80)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=0,
+        help="worker threads (default: one per student)",
+    )
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds")
+    parser.add_argument("--think-ms", type=float, default=200)
+    parser.add_argument("--s3-latency-ms", type=float, default=20)
+    parser.add_argument("--llm-first-token-ms", type=float, default=300)
+    parser.add_argument("--llm-token-ms", type=float, default=5)
+    parser.add_argument("--llm-tokens", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=120, help="per rerun")
+    parser.add_argument(
+        "--compare", action="store_true", help="run prompts in compare mode"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="append the result as a JSON line")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    random.seed(args.seed)
+    # AppTest resolves relative asset paths such as images/ from the cwd
+    os.chdir(ROOT)
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(result) + "\n")
+    if result["errors"]:
+        # Timings of sessions that failed part way are not comparable
+        sys.exit(
+            f"{result['errors']} errors; only {result['sessions_completed']} of "
+            f"{args.students} sessions completed"
+        )
+
+
+if __name__ == "__main__":
+    main()
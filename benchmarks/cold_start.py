@@ -0,0 +1,120 @@
+"""
+Measure how long a fresh app worker takes to serve its first pages.
+
+Each sample runs in a new Python process: render the login screen of app.py
+with AppTest, then log in and render the first question against a scratch
+SQLite database. Streamlit is imported before the clock starts, since every
+worker pays for it whatever the app does.
+
+    python -m benchmarks.cold_start --samples 10 --output bench.jsonl
+
+Also reports which heavy client libraries were already imported when the
+login screen rendered.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "benchmark"
+HEAVY_MODULES = ["boto3", "botocore", "openai", "httpx"]
+
+
+def sample() -> dict:
+    """Time one cold start; runs in a fresh interpreter."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+
+    start = time.perf_counter()
+    app.run()
+    login_seconds = time.perf_counter() - start
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    app.text_input[0].input("student@berkeley.edu")
+    app.text_input[1].input(PASSWORD)
+    start = time.perf_counter()
+    app.run()
+    question_seconds = time.perf_counter() - start
+
+    errors = [str(e.value) for e in app.exception]
+    return {
+        "login_ms": round(login_seconds * 1000, 1),
+        "first_question_ms": round(question_seconds * 1000, 1),
+        "loaded_at_login": loaded,
+        "errors": errors,
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    from .class_session import _git_commit, percentile
+
+    samples = []
+    for _ in range(args.samples):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "PASSWORD": PASSWORD,
+                "OPENAI_API_KEY": "benchmark",
+                "STORAGE_BACKEND": "sqlite",
+                "SQLITE_PATH": os.path.join(directory, "course.db"),
+                "DRAFT_JOURNAL_PATH": os.path.join(directory, "drafts.jsonl"),
+            }
+            child = subprocess.run(
+                [sys.executable, "-m", "benchmarks.cold_start", "--child"],
+                cwd=ROOT,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            samples.append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    login = [s["login_ms"] for s in samples]
+    question = [s["first_question_ms"] for s in samples]
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "samples": args.samples,
+        "login_p50_ms": statistics.median(login),
+        "login_p95_ms": percentile(login, 95),
+        "first_question_p50_ms": statistics.median(question),
+        "first_question_p95_ms": percentile(question, 95),
+        "loaded_at_login": samples[-1]["loaded_at_login"],
+        "errors": sum(len(s["errors"]) for s in samples),
+        "first_errors": [e for s in samples for e in s["errors"]][:5],
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--output", help="append the result as a JSON line")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    # AppTest resolves relative asset paths such as images/ from the cwd
+    os.chdir(ROOT)
+    if args.child:
+        sys.path.insert(0, ROOT)
+        print(json.dumps(sample()))
+        return
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
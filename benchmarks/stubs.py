@@ -0,0 +1,300 @@
+"""Local stand-ins for S3 and the OpenAI API with configurable latency."""
+
+import asyncio
+import hashlib
+import io
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Optional
+
+from botocore.exceptions import ClientError
+
+
+def _client_error(code: str, operation: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+
+def key_owner(key: str) -> Optional[str]:
+    """Map an object key to the user it belongs to, if any."""
+    _, _, rest = key.partition("/")
+    for suffix in ("_answers.csv", "_interactions.csv", "_interactions.jsonl.gz"):
+        if rest.endswith(suffix) and "/" not in rest:
+            return rest[: -len(suffix)]
+    if "/" in rest:
+        owner = rest.split("/", 1)[0]
+        return None if owner.startswith("_") else owner
+    # A listing prefix that is just the user's address
+    return rest if "@" in rest else None
+
+
+class LocalS3:
+    """
+    In-memory subset of the boto3 S3 client used by the S3 backend.
+    Every call sleeps for latency seconds and is counted, together with the
+    bytes moved, against the user that owns the key.
+    """
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self._objects = {}
+        self._lock = threading.Lock()
+        self.calls = defaultdict(int)
+        self.calls_by_user = defaultdict(int)
+        self.bytes_by_user = defaultdict(int)
+
+    def _record(self, operation: str, key: Optional[str], size: int = 0) -> None:
+        time.sleep(self.latency)
+        owner = key_owner(key) if key else None
+        with self._lock:
+            self.calls[operation] += 1
+            if owner is not None:
+                self.calls_by_user[owner] += 1
+                self.bytes_by_user[owner] += size
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        body = Body.encode() if isinstance(Body, str) else bytes(Body)
+        self._record("put_object", Key, len(body))
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        with self._lock:
+            current = self._objects.get(Key)
+            if IfNoneMatch == "*" and current is not None:
+                raise _client_error("PreconditionFailed", "PutObject")
+            if IfMatch is not None and (current is None or current[1] != IfMatch):
+                raise _client_error("PreconditionFailed", "PutObject")
+            self._objects[Key] = (body, etag, datetime.now(timezone.utc))
+        return {"ETag": etag}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, Range=None, **kwargs):
+        with self._lock:
+            current = self._objects.get(Key)
+        if current is None:
+            self._record("get_object", Key)
+            raise _client_error("NoSuchKey", "GetObject")
+        body, etag, modified = current
+        if IfNoneMatch is not None and IfNoneMatch == etag:
+            self._record("get_object", Key)
+            raise _client_error("304", "GetObject")
+        if Range:
+            start, _, end = Range.split("=", 1)[1].partition("-")
+            body = body[int(start) : int(end) + 1 if end else None]
+        self._record("get_object", Key, len(body))
+        return {
+            "Body": io.BytesIO(body),
+            "ETag": etag,
+            "LastModified": modified,
+            "ContentLength": len(body),
+        }
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._record("head_object", Key)
+        with self._lock:
+            current = self._objects.get(Key)
+        if current is None:
+            raise _client_error("404", "HeadObject")
+        body, etag, modified = current
+        return {"ETag": etag, "ContentLength": len(body), "LastModified": modified}
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        self._record("delete_objects", None)
+        with self._lock:
+            for obj in Delete["Objects"]:
+                self._objects.pop(obj["Key"], None)
+        return {}
+
+    def list_objects_v2(
+        self, Bucket, Prefix="", ContinuationToken=None, MaxKeys=1000, **kwargs
+    ):
+        self._record("list_objects_v2", Prefix)
+        with self._lock:
+            keys = sorted(key for key in self._objects if key.startswith(Prefix))
+            start = int(ContinuationToken or 0)
+            page = keys[start : start + MaxKeys]
+            contents = [
+                {
+                    "Key": key,
+                    "ETag": self._objects[key][1],
+                    "Size": len(self._objects[key][0]),
+                    "LastModified": self._objects[key][2],
+                }
+                for key in page
+            ]
+        response = {"Contents": contents, "KeyCount": len(contents)}
+        response["IsTruncated"] = start + MaxKeys < len(keys)
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + MaxKeys)
+        return response
+
+    def get_paginator(self, operation: str):
+        assert operation == "list_objects_v2"
+        return _ListPaginator(self)
+
+
+class _ListPaginator:
+    def __init__(self, client: LocalS3):
+        self._client = client
+
+    def paginate(self, **kwargs):
+        token = None
+        while True:
+            page = self._client.list_objects_v2(ContinuationToken=token, **kwargs)
+            yield page
+            if not page["IsTruncated"]:
+                return
+            token = page["NextContinuationToken"]
+
+
+class _LocalStream:
+    def __init__(self, tokens: list[str], model: str, token_latency: float, usage=None):
+        self._tokens = tokens
+        self._model = model
+        self._token_latency = token_latency
+        self._usage = usage
+        self.closed = False
+
+    def __iter__(self):
+        for token in self._tokens:
+            if self.closed:
+                return
+            time.sleep(self._token_latency)
+            yield SimpleNamespace(
+                model=self._model,
+                choices=[
+                    SimpleNamespace(
+                        delta=SimpleNamespace(content=token), finish_reason=None
+                    )
+                ],
+                usage=None,
+            )
+        yield SimpleNamespace(
+            model=self._model,
+            choices=[
+                SimpleNamespace(
+                    delta=SimpleNamespace(content=None), finish_reason="stop"
+                )
+            ],
+            usage=None,
+        )
+        if self._usage is not None:
+            # stream_options={"include_usage": True} adds a final usage chunk
+            yield SimpleNamespace(
+                model=self._model,
+                system_fingerprint="fp_local",
+                choices=[],
+                usage=self._usage,
+            )
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class LocalOpenAI:
+    """
+    Stand-in for the OpenAI client's chat.completions.create.
+    Responses echo the prompt after first_token_latency, then emit
+    response_tokens tokens token_latency apart.
+    """
+
+    def __init__(
+        self,
+        first_token_latency: float = 0.3,
+        token_latency: float = 0.005,
+        response_tokens: int = 200,
+    ):
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.response_tokens = response_tokens
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _tokens(self, messages) -> list[str]:
+        words = messages[-1]["content"].split() or ["..."]
+        return [f"{words[i % len(words)]} " for i in range(self.response_tokens)]
+
+    def create(self, messages, model, stream=False, stream_options=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.first_token_latency)
+        tokens = self._tokens(messages)
+        if stream:
+            return _LocalStream(
+                tokens,
+                model,
+                self.token_latency,
+                self._stream_usage(messages, tokens, stream_options),
+            )
+
+        time.sleep(self.token_latency * len(tokens))
+        return self._response(messages, model, tokens)
+
+    def _usage(self, messages, tokens: list[str]) -> SimpleNamespace:
+        prompt_tokens = len(messages[-1]["content"].split())
+        return SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=len(tokens),
+            total_tokens=prompt_tokens + len(tokens),
+        )
+
+    def _stream_usage(self, messages, tokens: list[str], stream_options):
+        if stream_options and stream_options.get("include_usage"):
+            return self._usage(messages, tokens)
+        return None
+
+    def _response(self, messages, model, tokens: list[str]) -> SimpleNamespace:
+        return SimpleNamespace(
+            model=model,
+            system_fingerprint="fp_local",
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(content="".join(tokens)),
+                    finish_reason="stop",
+                )
+            ],
+            usage=self._usage(messages, tokens),
+        )
+
+
+class _LocalAsyncStream:
+    def __init__(self, tokens: list[str], model: str, token_latency: float, usage=None):
+        # Reuse the sync stream's chunks without its blocking sleeps
+        self._chunks = _LocalStream(tokens, model, 0.0, usage)
+        self._token_latency = token_latency
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            await asyncio.sleep(self._token_latency)
+            yield chunk
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def close(self) -> None:
+        self._chunks.close()
+
+
+class LocalAsyncOpenAI:
+    """Async counterpart of LocalOpenAI; calls are counted on the sync stub."""
+
+    def __init__(self, local: LocalOpenAI):
+        self.local = local
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(
+        self, messages, model, stream=False, stream_options=None, **kwargs
+    ):
+        with self.local._lock:
+            self.local.calls += 1
+        await asyncio.sleep(self.local.first_token_latency)
+        tokens = self.local._tokens(messages)
+        if stream:
+            return _LocalAsyncStream(
+                tokens,
+                model,
+                self.local.token_latency,
+                self.local._stream_usage(messages, tokens, stream_options),
+            )
+        await asyncio.sleep(self.local.token_latency * len(tokens))
+        return self.local._response(messages, model, tokens)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Scanning the directory on every write would dominate small writes
+_EVICT_EVERY = 32
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so re-pasted prompts map to the same entry."""
+    return " ".join(prompt.split())
+
+
+def cache_key(prompt: str, parameters: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"prompt": normalize_prompt(prompt), "parameters": parameters},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of AI responses.
+    A small in-memory LRU sits in front of a directory of JSON files shared by
+    every worker on the machine. Entries expire after ttl seconds, and the
+    directory is trimmed oldest-first once it exceeds max_bytes.
+    """
+
+    def __init__(self, directory: str, ttl: float, memory_entries: int, max_bytes: int):
+        self.directory = directory
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key: str, created: float, text: str) -> None:
+        with self._lock:
+            self._memory[key] = (created, text)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, prompt: str, parameters: Dict[str, Any]) -> Optional[str]:
+        key = cache_key(prompt, parameters)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl:
+                    self._memory.move_to_end(key)
+                    return entry[1]
+                del self._memory[key]
+
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - entry["created"] >= self.ttl:
+            self._discard(key)
+            return None
+
+        self._remember(key, entry["created"], entry["text"])
+        return entry["text"]
+
+    def set(self, prompt: str, parameters: Dict[str, Any], text: str) -> None:
+        key = cache_key(prompt, parameters)
+        created = time.time()
+        self._remember(key, created, text)
+
+        # Write to a temp file and rename so readers never see partial JSON
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"created": created, "text": text}, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Error writing AI response cache: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % _EVICT_EVERY == 1
+        if due:
+            self._evict()
+
+    def _discard(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        """Drop expired files, then the oldest ones until under max_bytes."""
+        now = time.time()
+        files = []
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if now - stat.st_mtime >= self.ttl:
+                    self._discard(entry.name[: -len(".json")])
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.name))
+                total += stat.st_size
+
+        files.sort()
+        for _, size, name in files:
+            if total <= self.max_bytes:
+                break
+            self._discard(name[: -len(".json")])
+            total -= size
@@ -1,27 +1,413 @@
-from openai import OpenAI
-from typing import Dict, Any
-from ..config import OPENAI_API_KEY, DEFAULT_AI_PARAMS, LEGACY_MODEL, ADVANCED_MODEL
+from typing import Dict, Any, Iterator, Optional
+import asyncio
+import queue
+import threading
+import time
+from ..config import (
+    DEFAULT_AI_PARAMS,
+    MODELS,
+    LLM_MAX_IN_FLIGHT,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_BURST,
+    LLM_MAX_ATTEMPTS,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    LLM_QUEUE_TIMEOUT,
+    AI_CACHE_ENABLED,
+    AI_CACHE_DIR,
+    AI_CACHE_TTL,
+    AI_CACHE_MEMORY_ENTRIES,
+    AI_CACHE_MAX_BYTES,
+)
+from .. import tracing
+from ..clients import get_async_openai_client, run_async
+from .cache import ResponseCache
+from .scheduler import LLMScheduler, SharedStream
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+scheduler = LLMScheduler(
+    LLM_REQUESTS_PER_MINUTE,
+    max_in_flight=LLM_MAX_IN_FLIGHT,
+    burst=LLM_BURST,
+    max_attempts=LLM_MAX_ATTEMPTS,
+    backoff_base=LLM_BACKOFF_BASE,
+    backoff_max=LLM_BACKOFF_MAX,
+    queue_timeout=LLM_QUEUE_TIMEOUT,
+)
+
+response_cache = (
+    ResponseCache(
+        AI_CACHE_DIR,
+        ttl=AI_CACHE_TTL,
+        memory_entries=AI_CACHE_MEMORY_ENTRIES,
+        max_bytes=AI_CACHE_MAX_BYTES,
+    )
+    if AI_CACHE_ENABLED
+    else None
+)
 
 
 def get_model_name(assistance_level: str) -> str:
-    """Get the appropriate model name based on assistance level."""
-    return LEGACY_MODEL if assistance_level == "Legacy AI Model" else ADVANCED_MODEL
+    """Get the API model name for a playground model label."""
+    try:
+        return MODELS[assistance_level]
+    except KeyError:
+        raise ValueError(f"Unknown AI model: {assistance_level}") from None
+
+
+class CallTelemetry:
+    """Latency, token usage and model fingerprint of one completion call."""
+
+    __slots__ = ("_started", "_first_token_at", "_ended", "usage", "fingerprint")
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._first_token_at: Optional[float] = None
+        self._ended: Optional[float] = None
+        self.usage = None
+        self.fingerprint: Optional[str] = None
+
+    def observe(self, response: Any) -> None:
+        """Pick up usage and fingerprint from a response or stream chunk."""
+        if getattr(response, "usage", None) is not None:
+            self.usage = response.usage
+        if getattr(response, "system_fingerprint", None):
+            self.fingerprint = response.system_fingerprint
+
+    def first_token(self) -> None:
+        if self._first_token_at is None:
+            self._first_token_at = time.perf_counter()
 
+    def end(self) -> None:
+        if self._ended is None:
+            self._ended = time.perf_counter()
 
-def get_ai_response(prompt: str, assistance_level: str) -> tuple[str, Dict[Any, Any]]:
+    def to_dict(self, finish_reason: Optional[str]) -> Dict[str, Any]:
+        ended = self._ended or time.perf_counter()
+        first = self._first_token_at
+        return {
+            "prompt_tokens": getattr(self.usage, "prompt_tokens", None),
+            "completion_tokens": getattr(self.usage, "completion_tokens", None),
+            "total_tokens": getattr(self.usage, "total_tokens", None),
+            "latency_ms": round((ended - self._started) * 1000, 1),
+            "first_token_ms": (
+                round((first - self._started) * 1000, 1) if first else None
+            ),
+            "finish_reason": finish_reason,
+            "system_fingerprint": self.fingerprint,
+        }
+
+
+def _share_key(prompt: str, parameters: Dict[str, Any]) -> tuple:
+    return (prompt, tuple(sorted(parameters.items())))
+
+
+async def _produce(
+    key: tuple, stream: SharedStream, prompt: str, parameters: Dict[str, Any]
+) -> None:
     """
-    Get AI response for a given prompt.
-    Returns a tuple of (response: str, parameters: Dict[Any, Any])
+    Stream one completion from the API into a shared stream, under the
+    scheduler's limits. Runs on the shared event loop; cancelled when every
+    subscriber has left.
     """
-    model = get_model_name(assistance_level)
-    parameters = {"model": model, **DEFAULT_AI_PARAMS}
+    model = parameters["model"]
+    span = tracing.start_span("llm.stream", key=model)
+    try:
+        await scheduler.acquire(model)
+    except BaseException as e:
+        span.end(type(e).__name__)
+        scheduler.finish(key, stream, None, e)
+        raise
 
+    # Latency is measured from the request, not from queueing
+    call = stream.telemetry = CallTelemetry()
+    finish_reason = None
+    error = None
+    status = None
     try:
-        response = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}], **parameters
+        response = await scheduler.with_retries_async(
+            lambda: get_async_openai_client().chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+                stream_options={"include_usage": True},
+                **parameters,
+            )
         )
-        return response.choices[0].message.content, parameters
+        try:
+            async for chunk in response:
+                # With include_usage the last chunk has usage and no choices
+                call.observe(chunk)
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta.content:
+                    call.first_token()
+                    stream.publish(choice.delta.content)
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+        finally:
+            await response.close()
+    except asyncio.CancelledError:
+        finish_reason = status = "cancelled"
+        raise
     except Exception as e:
-        raise Exception(f"Error getting AI response: {str(e)}")
+        # Subscribers report it; the producer itself has nobody to tell
+        error = e
+        status = type(e).__name__
+    finally:
+        call.end()
+        scheduler.release()
+        if status is None:
+            completed = finish_reason in ("stop", "length")
+            status = "ok" if completed else finish_reason or "incomplete"
+        text = "".join(stream.chunks)
+        span.set(bytes=len(text.encode()))
+        span.end(status)
+        if response_cache is not None and finish_reason == "stop":
+            response_cache.set(prompt, parameters, text)
+        scheduler.finish(key, stream, finish_reason, error)
+
+
+def _start(key: tuple, prompt: str, parameters: Dict[str, Any]):
+    return lambda stream: run_async(_produce(key, stream, prompt, parameters))
+
+
+def _stream_telemetry(
+    call: CallTelemetry, stream: SharedStream, started: bool
+) -> CallTelemetry:
+    """
+    The subscriber that started a shared stream reports the API call; the
+    others report their own wait, with no tokens, as they were not billed.
+    """
+    if started and stream.telemetry is not None:
+        return stream.telemetry
+    call.end()
+    if stream.telemetry is not None:
+        call.fingerprint = stream.telemetry.fingerprint
+    return call
+
+
+class AIStreamError(Exception):
+    """Raised when a streamed response fails; keeps whatever text had arrived."""
+
+    def __init__(self, message: str, partial_text: str = ""):
+        super().__init__(message)
+        self.partial_text = partial_text
+
+
+class AIResponseStream:
+    """
+    Iterate over an AI response as text deltas arrive.
+    The assembled text, request parameters, finish reason and telemetry are
+    available on the instance once iteration ends. Identical requests in
+    flight at the same time share one API call. cancel() stops the stream at
+    the next chunk and close() leaves it, which ends the API call if no other
+    request is sharing it.
+    """
+
+    def __init__(self, prompt: str, assistance_level: str):
+        self.prompt = prompt
+        self.parameters = {
+            "model": get_model_name(assistance_level),
+            **DEFAULT_AI_PARAMS,
+        }
+        self.finish_reason: Optional[str] = None
+        self._chunks: list[str] = []
+        self._cancelled = threading.Event()
+        self._deltas: queue.Queue = queue.Queue()
+        self._key = None
+        self._stream: Optional[SharedStream] = None
+        self._call = CallTelemetry()
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    @property
+    def telemetry(self) -> Dict[str, Any]:
+        return self._call.to_dict(self.finish_reason)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        # Wake the iterator if it is waiting for the next delta
+        self._deltas.put(None)
+
+    def close(self) -> None:
+        self.cancel()
+        self._leave()
+
+    def _leave(self) -> None:
+        if self._stream is not None:
+            scheduler.leave(self._key, self._stream, self._deltas.put)
+
+    def __iter__(self) -> Iterator[str]:
+        request_parameters = dict(self.parameters)
+        if response_cache is not None:
+            cached = response_cache.get(self.prompt, request_parameters)
+            self.parameters["cache_hit"] = cached is not None
+            if cached is not None:
+                self.finish_reason = "stop"
+                self._chunks.append(cached)
+                self._call.end()
+                yield cached
+                return
+
+        self._key = _share_key(self.prompt, request_parameters)
+        try:
+            self._stream, started = scheduler.share(
+                self._key,
+                _start(self._key, self.prompt, request_parameters),
+                self._deltas.put,
+            )
+        except Exception as e:
+            raise AIStreamError(f"Error getting AI response: {str(e)}")
+        if not started:
+            self.parameters["shared"] = True
+
+        try:
+            while not self.cancelled:
+                delta = self._deltas.get()
+                if delta is None or self.cancelled:
+                    break
+                self._call.first_token()
+                self._chunks.append(delta)
+                yield delta
+        finally:
+            self._leave()
+
+        if self.cancelled:
+            self.finish_reason = "cancelled"
+            self._call.end()
+            return
+        self._call = _stream_telemetry(self._call, self._stream, started)
+        self.finish_reason = self._stream.finish_reason
+        error = self._stream.error
+        if error is not None:
+            if self.text:
+                raise AIStreamError(f"AI response interrupted: {str(error)}", self.text)
+            raise AIStreamError(f"Error getting AI response: {str(error)}")
+
+
+def stream_ai_response(prompt: str, assistance_level: str) -> AIResponseStream:
+    """Start a streamed AI response for a given prompt."""
+    return AIResponseStream(prompt, assistance_level)
+
+
+class ComparisonResult:
+    """One model's side of a comparison."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.parameters = {"model": get_model_name(label), **DEFAULT_AI_PARAMS}
+        self.finish_reason: Optional[str] = None
+        self.error: Optional[str] = None
+        self._chunks: list[str] = []
+        self._call = CallTelemetry()
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    @property
+    def telemetry(self) -> Dict[str, Any]:
+        return self._call.to_dict(self.finish_reason)
+
+
+class ModelComparison:
+    """
+    Stream one prompt from several models at once.
+    Each request runs on the shared event loop through the async client, so
+    the comparison takes about as long as the slowest model. Iterating yields
+    the index of whichever result just received text; a failed model records
+    its error on its result without stopping the others.
+    """
+
+    def __init__(self, prompt: str, assistance_levels: list[str]):
+        self.prompt = prompt
+        self.results = [ComparisonResult(label) for label in assistance_levels]
+        self._futures = []
+
+    def close(self) -> None:
+        for future in self._futures:
+            future.cancel()
+
+    def __iter__(self) -> Iterator[int]:
+        events: queue.Queue = queue.Queue()
+        self._futures = [
+            run_async(self._stream(result, index, events))
+            for index, result in enumerate(self.results)
+        ]
+        remaining = len(self._futures)
+        try:
+            while remaining:
+                index, delta = events.get()
+                if delta is None:
+                    remaining -= 1
+                else:
+                    yield index
+        finally:
+            self.close()
+
+    async def _stream(
+        self, result: ComparisonResult, index: int, events: queue.Queue
+    ) -> None:
+        try:
+            await self._stream_result(result, index, events)
+        except asyncio.CancelledError:
+            result.finish_reason = "cancelled"
+            raise
+        except Exception as e:
+            result.error = f"Error getting AI response: {str(e)}"
+        finally:
+            events.put((index, None))
+
+    async def _stream_result(
+        self, result: ComparisonResult, index: int, events: queue.Queue
+    ) -> None:
+        request_parameters = dict(result.parameters)
+        if response_cache is not None:
+            cached = response_cache.get(self.prompt, request_parameters)
+            result.parameters["cache_hit"] = cached is not None
+            if cached is not None:
+                result.finish_reason = "stop"
+                result._chunks.append(cached)
+                result._call.end()
+                events.put((index, cached))
+                return
+
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+
+        def deliver(delta: Optional[str]) -> None:
+            if delta is None:
+                loop.call_soon_threadsafe(
+                    lambda: finished.done() or finished.set_result(None)
+                )
+                return
+            result._call.first_token()
+            result._chunks.append(delta)
+            events.put((index, delta))
+
+        key = _share_key(self.prompt, request_parameters)
+        stream, started = scheduler.share(
+            key, _start(key, self.prompt, request_parameters), deliver
+        )
+        if not started:
+            result.parameters["shared"] = True
+        try:
+            await finished
+        finally:
+            scheduler.leave(key, stream, deliver)
+
+        result._call = _stream_telemetry(result._call, stream, started)
+        result.finish_reason = stream.finish_reason
+        if stream.error is not None:
+            raise stream.error
+
+
+def compare_ai_responses(prompt: str, assistance_levels: list[str]) -> ModelComparison:
+    """Start streaming a prompt from several models concurrently."""
+    return ModelComparison(prompt, assistance_levels)
@@ -0,0 +1,233 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SchedulerBusyError(Exception):
+    """Raised when a request waits longer than the queue timeout for a slot."""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate tokens/second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    async def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Take one token, waiting until one is available or deadline passes."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+class SharedStream:
+    """
+    One upstream stream of text deltas, fanned out to every subscriber.
+    Deltas are kept, so a subscriber that joins late is first sent everything
+    produced so far. Callbacks get each delta, then None once the stream has
+    finished; they run with the stream's lock held and must not block.
+    """
+
+    def __init__(self):
+        self.chunks: list[str] = []
+        self.finish_reason: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        # Set by the producer: its future, and whatever it reports the call as
+        self.producer: Optional[Future] = None
+        self.telemetry: Any = None
+        self._subscribers: list[Callable[[Optional[str]], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Optional[str]], None]) -> None:
+        with self._lock:
+            for delta in self.chunks:
+                callback(delta)
+            if self.done:
+                callback(None)
+            else:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Optional[str]], None]) -> int:
+        """Stop sending to callback; returns the number of subscribers left."""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+            return len(self._subscribers)
+
+    def publish(self, delta: str) -> None:
+        with self._lock:
+            self.chunks.append(delta)
+            for callback in self._subscribers:
+                callback(delta)
+
+    def finish(
+        self, finish_reason: Optional[str], error: Optional[BaseException] = None
+    ) -> None:
+        with self._lock:
+            self.finish_reason = finish_reason
+            self.error = error
+            self.done = True
+            for callback in self._subscribers:
+                callback(None)
+            self._subscribers.clear()
+
+
+class LLMScheduler:
+    """
+    Process-wide gate in front of the OpenAI API.
+
+    Every call takes a token from its model's bucket and one of a fixed number
+    of in-flight slots, and is retried with jittered exponential backoff when
+    the API answers 429. Calls wait for both on the shared event loop, where
+    acquire and release must be called, so waiting holds no thread and the
+    queue timeout runs from the moment a call asks. Streams sharing a key are
+    merged so that only the first one reaches the API and the rest are sent
+    its deltas as they arrive.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Dict[str, float],
+        max_in_flight: int = 8,
+        burst: float = 10,
+        max_attempts: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 20.0,
+        queue_timeout: Optional[float] = 60.0,
+    ):
+        self._requests_per_minute = requests_per_minute
+        self._burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._slots = asyncio.BoundedSemaphore(max_in_flight)
+        self._max_attempts = max_attempts
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._queue_timeout = queue_timeout
+        self._flights: Dict[Hashable, SharedStream] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, model: str) -> Optional[TokenBucket]:
+        rpm = self._requests_per_minute.get(model)
+        if not rpm:
+            return None
+        with self._lock:
+            if model not in self._buckets:
+                self._buckets[model] = TokenBucket(rpm / 60, self._burst)
+            return self._buckets[model]
+
+    async def acquire(self, model: str) -> None:
+        """Wait for the model's rate limit and a free in-flight slot."""
+        deadline = (
+            None
+            if self._queue_timeout is None
+            else time.monotonic() + self._queue_timeout
+        )
+        bucket = self._bucket(model)
+        if bucket is not None and not await bucket.acquire(deadline):
+            raise SchedulerBusyError("The AI service is busy. Please try again.")
+        timeout = None if deadline is None else max(0, deadline - time.monotonic())
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise SchedulerBusyError(
+                "The AI service is busy. Please try again."
+            ) from None
+
+    def release(self) -> None:
+        self._slots.release()
+
+    async def with_retries_async(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn, backing off and retrying while it is rate limited."""
+        # Imported here so the scheduler can be built before openai is loaded
+        from openai import RateLimitError
+
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                return await fn()
+            except RateLimitError as e:
+                if attempt == self._max_attempts:
+                    raise
+                await asyncio.sleep(self._retry_delay(e, attempt))
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                pass
+        ceiling = min(self._backoff_max, self._backoff_base * 2 ** (attempt - 1))
+        # Full jitter keeps a burst of 429s from retrying in lockstep
+        delay = random.uniform(0, ceiling)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def share(
+        self,
+        key: Hashable,
+        start: Callable[[SharedStream], Future],
+        callback: Callable[[Optional[str]], None],
+    ) -> tuple[SharedStream, bool]:
+        """
+        Subscribe callback to the stream in flight for key, or to a new one
+        that start launches. Returns the stream and whether it is new.
+        """
+        with self._lock:
+            stream = self._flights.get(key)
+            started = stream is None
+            if started:
+                stream = self._flights[key] = SharedStream()
+            if started:
+                try:
+                    stream.producer = start(stream)
+                except BaseException:
+                    del self._flights[key]
+                    raise
+            stream.subscribe(callback)
+        return stream, started
+
+    def leave(
+        self,
+        key: Hashable,
+        stream: SharedStream,
+        callback: Callable[[Optional[str]], None],
+    ) -> None:
+        """Unsubscribe callback, cancelling the stream if nobody else is left."""
+        with self._lock:
+            if stream.unsubscribe(callback) or stream.done:
+                return
+            if self._flights.get(key) is stream:
+                del self._flights[key]
+        stream.producer.cancel()
+
+    def finish(
+        self,
+        key: Hashable,
+        stream: SharedStream,
+        finish_reason: Optional[str],
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """End a shared stream; later calls with its key start a new one."""
+        with self._lock:
+            if self._flights.get(key) is stream:
+                del self._flights[key]
+        stream.finish(finish_reason, error)
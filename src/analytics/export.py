@@ -0,0 +1,301 @@
+"""
+Export answers and playground interactions to partitioned Parquet snapshots.
+
+    python -m src.analytics.export --output data/analytics
+
+Each dataset is written under {output}/{dataset}/ in Hive layout,
+question_number={n}/date={YYYY-MM-DD}/part-{run}.parquet, with the playground
+parameters flattened into typed columns. Runs are incremental: only records
+stamped after the watermark in {output}/_watermark.json are exported, so a run
+adds at most one file per partition it touched. Records stream through in
+bounded batches, so memory does not grow with the size of the bucket.
+
+Read a snapshot with pandas.read_parquet(f"{output}/answers"). A resubmitted
+answer is exported again with its new submitted_at, so keep the latest row per
+(email, question_number).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..config import (
+    ANALYTICS_EXPORT_DIR,
+    ANALYTICS_BATCH_ROWS,
+    ANALYTICS_SETTLE_SECONDS,
+)
+from ..data.backends import get_backend
+from ..data.records import nan_to_none
+
+WATERMARK_FILE = "_watermark.json"
+
+# question_number and the date are partition keys, so they live in the path
+ANSWER_SCHEMA = pa.schema(
+    [
+        ("email", pa.string()),
+        ("answer", pa.string()),
+        ("submitted_at", pa.timestamp("us")),
+    ]
+)
+
+# Known parameters get typed columns; anything else stays JSON in "parameters"
+PARAMETER_FIELDS = [
+    ("model", pa.string()),
+    ("temperature", pa.float64()),
+    ("top_p", pa.float64()),
+    ("presence_penalty", pa.float64()),
+    ("cache_hit", pa.bool_()),
+]
+
+# Call telemetry; missing for interactions saved before it was captured
+TELEMETRY_FIELDS = [
+    ("prompt_tokens", pa.int64()),
+    ("completion_tokens", pa.int64()),
+    ("total_tokens", pa.int64()),
+    ("latency_ms", pa.float64()),
+    ("first_token_ms", pa.float64()),
+    ("finish_reason", pa.string()),
+    ("system_fingerprint", pa.string()),
+]
+
+PLAYGROUND_SCHEMA = pa.schema(
+    [
+        ("interaction_id", pa.string()),
+        ("email", pa.string()),
+        ("prompt", pa.string()),
+        ("response", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        *PARAMETER_FIELDS,
+        ("parameters", pa.string()),
+        *TELEMETRY_FIELDS,
+    ]
+)
+
+
+def answer_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "email": record["email"],
+        "answer": nan_to_none(record["answer"]),
+        "submitted_at": datetime.fromisoformat(record["submitted_at"]),
+    }
+
+
+def interaction_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten one raw interaction record, parsing its parameters JSON once."""
+    parameters = nan_to_none(record.get("parameters"))
+    if isinstance(parameters, str):
+        try:
+            parameters = json.loads(parameters)
+        except ValueError:
+            parameters = {}
+    parameters = dict(parameters or {})
+
+    row = {
+        "interaction_id": nan_to_none(record.get("interaction_id")),
+        "email": record["email"],
+        "prompt": nan_to_none(record["prompt"]),
+        "response": nan_to_none(record["response"]),
+        "timestamp": datetime.fromisoformat(record["timestamp"]),
+    }
+    for name, _ in PARAMETER_FIELDS:
+        row[name] = parameters.pop(name, None)
+    row["parameters"] = json.dumps(parameters) if parameters else None
+    for name, field_type in TELEMETRY_FIELDS:
+        value = nan_to_none(record.get(name))
+        # CSV columns with gaps come back as floats
+        if value is not None and pa.types.is_integer(field_type):
+            value = int(value)
+        row[name] = value
+    return row
+
+
+class PartitionedWriter:
+    """
+    Buffer rows per (question_number, date) partition and append them to one
+    Parquet file per partition. Once batch_rows rows are buffered across all
+    partitions, every buffer is written out as a row group. Files are written
+    under a hidden name and renamed on close, so readers never pick up a
+    partial file.
+    """
+
+    def __init__(self, root: str, schema: pa.Schema, run_id: str, batch_rows: int):
+        self.root = root
+        self.schema = schema
+        self.run_id = run_id
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self._buffered = 0
+        self._buffers: Dict[tuple[int, str], list[Dict[str, Any]]] = {}
+        self._writers: Dict[tuple[int, str], tuple[pq.ParquetWriter, str, str]] = {}
+
+    def add(self, question_number: int, date: str, row: Dict[str, Any]) -> None:
+        partition = (question_number, date)
+        buffer = self._buffers.setdefault(partition, [])
+        buffer.append(row)
+        self.rows += 1
+        self._buffered += 1
+        if self._buffered >= self.batch_rows:
+            for partition in list(self._buffers):
+                self._write(partition)
+
+    def _write(self, partition: tuple[int, str]) -> None:
+        rows = self._buffers.pop(partition, [])
+        if not rows:
+            return
+        self._buffered -= len(rows)
+        if partition not in self._writers:
+            directory = os.path.join(
+                self.root,
+                f"question_number={partition[0]}",
+                f"date={partition[1]}",
+            )
+            os.makedirs(directory, exist_ok=True)
+            name = f"part-{self.run_id}.parquet"
+            tmp_path = os.path.join(directory, f".{name}.tmp")
+            writer = pq.ParquetWriter(tmp_path, self.schema)
+            self._writers[partition] = (
+                writer,
+                tmp_path,
+                os.path.join(directory, name),
+            )
+        writer = self._writers[partition][0]
+        writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self) -> int:
+        """Write what is buffered and publish the files; returns the file count."""
+        for partition in list(self._buffers):
+            self._write(partition)
+        for writer, tmp_path, path in self._writers.values():
+            writer.close()
+            os.replace(tmp_path, path)
+        return len(self._writers)
+
+    def abort(self) -> None:
+        """Discard every file of this run, e.g. after the source failed."""
+        for writer, tmp_path, _ in self._writers.values():
+            writer.close()
+            os.remove(tmp_path)
+        self._writers.clear()
+
+
+def export_dataset(
+    records: Iterable[Dict[str, Any]],
+    to_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+    time_column: str,
+    root: str,
+    schema: pa.Schema,
+    run_id: str,
+) -> int:
+    """Stream records into partitioned Parquet under root; returns the row count."""
+    writer = PartitionedWriter(root, schema, run_id, ANALYTICS_BATCH_ROWS)
+    try:
+        for record in records:
+            writer.add(
+                int(record["question_number"]),
+                record[time_column][:10],
+                to_row(record),
+            )
+    except BaseException:
+        # The watermark is not advanced, so the next run exports these again
+        writer.abort()
+        raise
+    writer.close()
+    return writer.rows
+
+
+def _read_watermarks(output: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(output, WATERMARK_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_watermarks(output: str, watermarks: Dict[str, str]) -> None:
+    path = os.path.join(output, WATERMARK_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run(
+    output: str = ANALYTICS_EXPORT_DIR,
+    datasets: Optional[list[str]] = None,
+    full: bool = False,
+) -> Dict[str, int]:
+    """Export new records for each dataset and advance its watermark."""
+    backend = get_backend()
+    sources = {
+        "answers": (
+            backend.iter_answers,
+            answer_row,
+            "submitted_at",
+            ANSWER_SCHEMA,
+        ),
+        "playground": (
+            backend.iter_playground_interactions,
+            interaction_row,
+            "timestamp",
+            PLAYGROUND_SCHEMA,
+        ),
+    }
+    os.makedirs(output, exist_ok=True)
+    watermarks = _read_watermarks(output)
+    run_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    until = (datetime.now() - timedelta(seconds=ANALYTICS_SETTLE_SECONDS)).isoformat()
+
+    counts = {}
+    for name in datasets or list(sources):
+        iterate, to_row, time_column, schema = sources[name]
+        root = os.path.join(output, name)
+        if full:
+            shutil.rmtree(root, ignore_errors=True)
+            watermarks.pop(name, None)
+
+        records = (
+            record
+            for record in iterate(watermarks.get(name))
+            if record[time_column] <= until
+        )
+        counts[name] = export_dataset(
+            records, to_row, time_column, root, schema, run_id
+        )
+        watermarks[name] = until
+        _write_watermarks(output, watermarks)
+    return counts
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default=ANALYTICS_EXPORT_DIR)
+    parser.add_argument(
+        "--dataset",
+        action="append",
+        choices=["answers", "playground"],
+        help="export only this dataset (repeatable; default: both)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="discard existing snapshots and the watermark, then export everything",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    counts = run(args.output, args.dataset, args.full)
+    for name, rows in counts.items():
+        print(f"Exported {rows} {name} records to {os.path.join(args.output, name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Write per-question grading sheets of every student's latest answer.
+
+    python -m src.analytics.grading --output data/grading [--question 2]
+
+For each question N (numbered as in the app) this writes question_N.csv
+and/or question_N.jsonl with one row per student: the task title, the answer and
+when it was submitted, plus empty grade and feedback columns in the CSV. The
+full question text is written once, to question_N.md. Answers are streamed
+from storage in bounded batches and each row is written as it arrives, so
+memory stays flat whether the course has 50 students or 50,000.
+"""
+
+import argparse
+import csv
+import json
+import os
+from typing import Any, Dict, Optional, TextIO
+
+from ..catalog import CATALOG
+from ..config import GRADING_EXPORT_DIR
+from ..data.records import AnswerRecord
+from ..data.storage import iter_answers
+
+SHEET_COLUMNS = ["email", "question", "title", "answer", "submitted_at"]
+GRADER_COLUMNS = ["grade", "feedback"]
+FORMATS = ("csv", "jsonl")
+
+
+class SheetWriter:
+    """
+    One open file per question and format, created on the question's first
+    row. Files are written under a hidden name and renamed on close, so a
+    failed run never leaves a sheet that looks complete.
+    """
+
+    def __init__(self, output: str, formats: list[str]):
+        self.output = output
+        self.formats = formats
+        self.rows: Dict[int, int] = {}
+        # (question_number, format) -> (file, csv writer or None, tmp, path)
+        self._files: Dict[tuple[int, str], tuple[TextIO, Any, str, str]] = {}
+
+    def _open(self, question_number: int, fmt: str) -> tuple[TextIO, Any]:
+        key = (question_number, fmt)
+        if key not in self._files:
+            name = f"question_{question_number + 1}.{fmt}"
+            tmp_path = os.path.join(self.output, f".{name}.tmp")
+            f = open(tmp_path, "w", newline="")
+            writer = None
+            if fmt == "csv":
+                writer = csv.DictWriter(f, SHEET_COLUMNS + GRADER_COLUMNS)
+                writer.writeheader()
+            self._files[key] = (f, writer, tmp_path, os.path.join(self.output, name))
+        f, writer, _, _ = self._files[key]
+        return f, writer
+
+    def add(self, record: AnswerRecord) -> None:
+        question = CATALOG[record.question_number]
+        row = {
+            "email": record.email,
+            "question": record.question_number + 1,
+            "title": question.title,
+            "answer": record.answer,
+            "submitted_at": record.submitted_at,
+        }
+        for fmt in self.formats:
+            f, writer = self._open(record.question_number, fmt)
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(row) + "\n")
+        self.rows[record.question_number] = self.rows.get(record.question_number, 0) + 1
+
+    def close(self) -> None:
+        """Publish every sheet, with the question text beside it."""
+        for f, _, tmp_path, path in self._files.values():
+            f.close()
+            os.replace(tmp_path, path)
+        for question_number in self.rows:
+            path = os.path.join(self.output, f"question_{question_number + 1}.md")
+            with open(path, "w") as f:
+                f.write(CATALOG[question_number].text)
+
+    def abort(self) -> None:
+        for f, _, tmp_path, _ in self._files.values():
+            f.close()
+            os.remove(tmp_path)
+        self._files.clear()
+
+
+def run(
+    output: str = GRADING_EXPORT_DIR,
+    questions: Optional[list[int]] = None,
+    formats: Optional[list[str]] = None,
+) -> Dict[int, int]:
+    """
+    Write sheets for the given question numbers (0-based), or all of them.
+    Returns the number of answers written per question.
+    """
+    os.makedirs(output, exist_ok=True)
+    wanted = set(questions) if questions else None
+    # A single question can be filtered by key, before anything is downloaded
+    only = questions[0] if questions and len(questions) == 1 else None
+
+    sheets = SheetWriter(output, formats or ["csv"])
+    try:
+        for record in iter_answers(question_number=only):
+            if wanted is None or record.question_number in wanted:
+                sheets.add(record)
+    except BaseException:
+        sheets.abort()
+        raise
+    sheets.close()
+    return sheets.rows
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default=GRADING_EXPORT_DIR)
+    parser.add_argument(
+        "--question",
+        action="append",
+        type=int,
+        choices=range(1, len(CATALOG) + 1),
+        metavar="N",
+        help="write only this question, numbered as in the app (repeatable)",
+    )
+    parser.add_argument(
+        "--format",
+        action="append",
+        choices=FORMATS,
+        help="sheet format (repeatable; default: csv)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    questions = [n - 1 for n in args.question] if args.question else None
+    counts = run(args.output, questions, args.format)
+    for question_number, rows in sorted(counts.items()):
+        print(f"Question {question_number + 1}: {rows} answers")
+    print(f"Wrote grading sheets to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
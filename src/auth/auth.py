@@ -1,4 +1,25 @@
-from ..config import PASSWORD
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from ..config import (
+    PASSWORD,
+    SESSION_SECRET,
+    SESSION_TTL_SECONDS,
+    SESSION_CACHE_ENTRIES,
+)
+
+_secret = (SESSION_SECRET or secrets.token_hex(32)).encode()
+
+# session id -> (expires at, state loaded at login)
+_sessions: OrderedDict[str, tuple[float, Dict[str, Any]]] = OrderedDict()
+_sessions_lock = threading.Lock()
 
 
 def authenticate_user(email: str, password: str) -> tuple[bool, str]:
@@ -13,3 +34,80 @@ def authenticate_user(email: str, password: str) -> tuple[bool, str]:
         return False, "Incorrect password. Please try again."
 
     return True, "Authentication successful"
+
+
+def _encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _digest(payload: str) -> bytes:
+    return hmac.new(_secret, payload.encode(), hashlib.sha256).digest()
+
+
+def issue_session_token(email: str) -> str:
+    """Return a signed token naming the user, a new session id and its expiry."""
+    claims = {
+        "email": email,
+        "sid": secrets.token_hex(16),
+        "exp": int(time.time() + SESSION_TTL_SECONDS),
+    }
+    payload = _encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_encode(_digest(payload))}"
+
+
+def _claims(token: str) -> Optional[Dict[str, Any]]:
+    """The token's claims if it is authentic and unexpired, else None."""
+    payload, _, signature = token.partition(".")
+    # Tokens come from the URL, so anything that fails to decode is invalid
+    try:
+        if not hmac.compare_digest(_decode(signature), _digest(payload)):
+            return None
+        claims = json.loads(_decode(payload))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(claims, dict):
+        return None
+    exp = claims.get("exp")
+    if not isinstance(exp, (int, float)) or exp <= time.time():
+        return None
+    if not isinstance(claims.get("email"), str) or "sid" not in claims:
+        return None
+    return claims
+
+
+def verify_session_token(token: str) -> Optional[str]:
+    """Return the token's email if it is authentic and unexpired, else None."""
+    claims = _claims(token)
+    return claims["email"] if claims else None
+
+
+def cache_session(token: str, state: Dict[str, Any]) -> None:
+    """Keep a session's loaded state in memory until its token expires."""
+    claims = _claims(token)
+    if claims is None:
+        return
+    with _sessions_lock:
+        _sessions[claims["sid"]] = (claims["exp"], state)
+        _sessions.move_to_end(claims["sid"])
+        while len(_sessions) > SESSION_CACHE_ENTRIES:
+            _sessions.popitem(last=False)
+
+
+def get_cached_session(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the state cached for a valid token, or None if the token is
+    invalid or the state is gone, e.g. after a restart or eviction.
+    """
+    claims = _claims(token)
+    if claims is None:
+        return None
+    with _sessions_lock:
+        entry = _sessions.get(claims["sid"])
+        if entry is None:
+            return None
+        _sessions.move_to_end(claims["sid"])
+        return entry[1]
@@ -0,0 +1,43 @@
+"""
+Questions from questions.py, parsed once at import into Question objects so
+reruns do not re-split the markdown.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from questions import QUESTIONS
+
+IMAGE_MARKER = "![Image]"
+
+
+@dataclass(frozen=True, slots=True)
+class Question:
+    number: int
+    title: str
+    body: str
+    image_path: Optional[str]
+    text: str
+
+
+def parse_question(number: int, text: str) -> Question:
+    """Split a question into its title line, body text and optional image."""
+    image_path = None
+    content = text
+    if IMAGE_MARKER in text:
+        content, image_ref = text.split(IMAGE_MARKER)[:2]
+        image_path = image_ref.strip()[1:-1].replace("(", "").replace(")", "").strip()
+
+    title_end = content.find("\n")
+    return Question(
+        number=number,
+        title=content[:title_end].strip(),
+        body=content[title_end:].strip(),
+        image_path=image_path,
+        text=text,
+    )
+
+
+CATALOG: tuple[Question, ...] = tuple(
+    parse_question(number, text) for number, text in enumerate(QUESTIONS)
+)
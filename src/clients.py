@@ -0,0 +1,123 @@
+"""
+Process-wide API clients, created on first use and shared by every session.
+boto3 and openai are only imported when a client is first needed, so a worker
+can render the login screen without paying for either.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from typing import Any, Coroutine
+
+from .config import (
+    OPENAI_API_KEY,
+    AWS_ACCESS_KEY_ID,
+    AWS_SECRET_ACCESS_KEY,
+    S3_MAX_POOL_CONNECTIONS,
+    S3_CONNECT_TIMEOUT,
+    S3_READ_TIMEOUT,
+    S3_MAX_ATTEMPTS,
+    S3_RETRY_MODE,
+)
+
+_lock = threading.Lock()
+_s3_client = None
+_openai_client = None
+_async_openai_client = None
+_loop = None
+
+
+def get_s3_client() -> Any:
+    """Return the shared boto3 S3 client."""
+    global _s3_client
+    if _s3_client is None:
+        with _lock:
+            if _s3_client is None:
+                import boto3
+                from botocore.config import Config
+
+                _s3_client = boto3.client(
+                    "s3",
+                    aws_access_key_id=AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                    config=Config(
+                        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                        connect_timeout=S3_CONNECT_TIMEOUT,
+                        read_timeout=S3_READ_TIMEOUT,
+                        retries={
+                            "max_attempts": S3_MAX_ATTEMPTS,
+                            "mode": S3_RETRY_MODE,
+                        },
+                    ),
+                )
+    return _s3_client
+
+
+def get_openai_client() -> Any:
+    """Return the shared OpenAI client."""
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+
+                # Retries are owned by the scheduler so 429s back off globally
+                _openai_client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+    return _openai_client
+
+
+def set_openai_client(client: Any) -> None:
+    """Replace the shared OpenAI client, e.g. with a local stand-in."""
+    global _openai_client
+    with _lock:
+        _openai_client = client
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared event loop that async clients run on."""
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="async-clients", daemon=True
+                ).start()
+                _loop = loop
+    return _loop
+
+
+def run_async(coro: Coroutine) -> concurrent.futures.Future:
+    """
+    Schedule coro on the shared event loop from a synchronous thread.
+    The coroutine sees the caller's context variables, e.g. the tracing rerun,
+    and cancelling the returned future cancels it.
+    """
+    context = contextvars.copy_context()
+
+    async def in_context():
+        return await asyncio.get_running_loop().create_task(coro, context=context)
+
+    return asyncio.run_coroutine_threadsafe(in_context(), get_event_loop())
+
+
+def get_async_openai_client() -> Any:
+    """Return the shared AsyncOpenAI client; use it only on get_event_loop()."""
+    global _async_openai_client
+    if _async_openai_client is None:
+        with _lock:
+            if _async_openai_client is None:
+                from openai import AsyncOpenAI
+
+                _async_openai_client = AsyncOpenAI(
+                    api_key=OPENAI_API_KEY, max_retries=0
+                )
+    return _async_openai_client
+
+
+def set_async_openai_client(client: Any) -> None:
+    """Replace the shared AsyncOpenAI client, e.g. with a local stand-in."""
+    global _async_openai_client
+    with _lock:
+        _async_openai_client = client
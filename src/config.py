@@ -8,18 +8,125 @@ load_dotenv()
 PASSWORD = os.getenv("PASSWORD")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Signed session tokens let a page reload resume without logging in again.
+# Without SESSION_SECRET a random one is used, so tokens last until restart
+SESSION_SECRET = os.getenv("SESSION_SECRET")
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(12 * 3600)))
+# Signed-in sessions whose loaded state is kept in memory for reloads
+SESSION_CACHE_ENTRIES = int(os.getenv("SESSION_CACHE_ENTRIES", "2000"))
+
 # AI Model configurations
 LEGACY_MODEL = "gpt-3.5-turbo-0125"
 ADVANCED_MODEL = "gpt-4o-2024-08-06"
 
+# Models offered in the playground: UI label -> API model name
+MODELS = {
+    "GPT-3.5-turbo": LEGACY_MODEL,
+    "GPT-4o": ADVANCED_MODEL,
+}
+
+# USD per million (prompt, completion) tokens, for playground spend estimates
+MODEL_PRICES = {
+    LEGACY_MODEL: (0.50, 1.50),
+    ADVANCED_MODEL: (2.50, 10.00),
+}
+# Users whose playground usage aggregates are kept in memory
+USAGE_CACHE_ENTRIES = int(os.getenv("USAGE_CACHE_ENTRIES", "2000"))
+
+# Shared limits for OpenAI calls across every session in the process
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_REQUESTS_PER_MINUTE = {
+    LEGACY_MODEL: float(os.getenv("LEGACY_MODEL_RPM", "500")),
+    ADVANCED_MODEL: float(os.getenv("ADVANCED_MODEL_RPM", "500")),
+}
+LLM_BURST = float(os.getenv("LLM_BURST", "10"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "60"))
+
+# Opt-in cache of playground responses keyed on model, parameters and prompt
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "false").lower() == "true"
+AI_CACHE_DIR = os.getenv("AI_CACHE_DIR", ".cache/ai_responses")
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600)))
+AI_CACHE_MEMORY_ENTRIES = int(os.getenv("AI_CACHE_MEMORY_ENTRIES", "256"))
+AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+
 # S3 Configuration
 S3_BUCKET = os.getenv("S3_BUCKET")
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 
+# Storage backend: "s3" (per-user CSV objects) or "sqlite" (local database)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "data/course.db")
+
 # File paths (now S3 key prefixes)
 ANSWERS_PREFIX = "answers/"
 PLAYGROUND_PREFIX = "playground/"
+DRAFTS_PREFIX = "drafts/"
+
+# Playground prompt and response bodies of at least this many bytes are stored
+# once as content-addressed blobs under PLAYGROUND_BLOB_PREFIX; shorter ones
+# stay inline, where they cost less than a separate GET
+PLAYGROUND_BLOB_PREFIX = "playground-blobs/"
+PLAYGROUND_BLOB_MIN_BYTES = int(os.getenv("PLAYGROUND_BLOB_MIN_BYTES", "256"))
+PLAYGROUND_BLOB_CACHE_ENTRIES = int(os.getenv("PLAYGROUND_BLOB_CACHE_ENTRIES", "4096"))
+
+# Seconds a cached answers file is served from memory before its ETag is
+# revalidated against S3
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "30"))
+
+# Appended playground log records are folded into the user's history once
+# a user has this many, counted as they are written and when their log is read
+PLAYGROUND_COMPACT_THRESHOLD = int(os.getenv("PLAYGROUND_COMPACT_THRESHOLD", "50"))
+
+# Concurrent downloads when aggregating every user's playground log
+ADMIN_FETCH_WORKERS = int(os.getenv("ADMIN_FETCH_WORKERS", "16"))
+
+# Concurrent fetches while a student's session is bootstrapped at login
+BOOTSTRAP_WORKERS = int(os.getenv("BOOTSTRAP_WORKERS", "16"))
+
+# Answer drafts: journaled locally at most every DRAFT_DEBOUNCE_SECONDS and
+# sent to storage in batches every DRAFT_FLUSH_SECONDS (and on submit). The
+# journal is rewritten once it grows past DRAFT_JOURNAL_MAX_BYTES
+DRAFT_JOURNAL_PATH = os.getenv("DRAFT_JOURNAL_PATH", "data/drafts.jsonl")
+DRAFT_DEBOUNCE_SECONDS = float(os.getenv("DRAFT_DEBOUNCE_SECONDS", "2"))
+DRAFT_FLUSH_SECONDS = float(os.getenv("DRAFT_FLUSH_SECONDS", "30"))
+DRAFT_JOURNAL_MAX_BYTES = int(os.getenv("DRAFT_JOURNAL_MAX_BYTES", "1000000"))
+
+# Background S3 writer: worker threads and retry policy (seconds)
+WRITER_WORKERS = int(os.getenv("WRITER_WORKERS", "4"))
+WRITER_MAX_ATTEMPTS = int(os.getenv("WRITER_MAX_ATTEMPTS", "5"))
+WRITER_BACKOFF_BASE = float(os.getenv("WRITER_BACKOFF_BASE", "0.2"))
+# Writes that must not be lost, such as answers, are retried this often once
+# every attempt has failed, until they succeed
+WRITER_RETRY_SECONDS = float(os.getenv("WRITER_RETRY_SECONDS", "10"))
+
+# Partitioned Parquet snapshots written by python -m src.analytics.export
+ANALYTICS_EXPORT_DIR = os.getenv("ANALYTICS_EXPORT_DIR", "data/analytics")
+# Rows buffered across all partitions before they are written as row groups
+ANALYTICS_BATCH_ROWS = int(os.getenv("ANALYTICS_BATCH_ROWS", "10000"))
+# Records younger than this many seconds wait for the next export, so saves
+# still in the background writer's queue are not skipped by the watermark
+ANALYTICS_SETTLE_SECONDS = float(os.getenv("ANALYTICS_SETTLE_SECONDS", "300"))
+
+# Per-question grading sheets written by python -m src.analytics.grading
+GRADING_EXPORT_DIR = os.getenv("GRADING_EXPORT_DIR", "data/grading")
+
+# Shared boto3 S3 client: the pool must cover the writer and fetch workers
+S3_MAX_POOL_CONNECTIONS = int(
+    os.getenv("S3_MAX_POOL_CONNECTIONS", str(WRITER_WORKERS + ADMIN_FETCH_WORKERS))
+)
+S3_CONNECT_TIMEOUT = float(os.getenv("S3_CONNECT_TIMEOUT", "5"))
+S3_READ_TIMEOUT = float(os.getenv("S3_READ_TIMEOUT", "30"))
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", "3"))
+# "standard" or "adaptive" (client-side rate limiting on throttling errors)
+S3_RETRY_MODE = os.getenv("S3_RETRY_MODE", "standard")
+
+# Question images are downscaled to this width (the centered layout's
+# content width) once per process
+IMAGE_MAX_WIDTH = int(os.getenv("IMAGE_MAX_WIDTH", "704"))
 
 # Default AI parameters
 DEFAULT_AI_PARAMS = {
@@ -27,3 +134,16 @@ DEFAULT_AI_PARAMS = {
     "top_p": 0.9,
     "presence_penalty": 0.1,
 }
+
+# Tracing of storage and AI calls; off by default so it costs nothing
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+# "jsonl" appends every span; "prometheus" rewrites per-span totals
+TRACE_EXPORT_FORMAT = os.getenv("TRACE_EXPORT_FORMAT", "jsonl")
+
+# Users who see the debug panel in the sidebar
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.getenv("ADMIN_EMAILS", "").split(",")
+    if email.strip()
+}
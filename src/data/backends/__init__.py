@@ -0,0 +1,38 @@
+import threading
+from typing import Optional
+
+from ...config import STORAGE_BACKEND
+from .base import StorageBackend
+
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str) -> StorageBackend:
+    """Build a storage backend by name ("s3" or "sqlite")."""
+    if name == "s3":
+        from .s3 import S3Backend
+
+        return S3Backend()
+    if name == "sqlite":
+        from .sqlite import SQLiteBackend
+
+        return SQLiteBackend()
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+def get_backend() -> StorageBackend:
+    """Return the process-wide backend selected by STORAGE_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(STORAGE_BACKEND)
+    return _backend
+
+
+def set_backend(backend: StorageBackend) -> None:
+    """Replace the process-wide backend, e.g. with a local stand-in."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,97 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import pandas as pd
+
+from ..records import AnswerRecord, DraftRecord, InteractionRecord
+
+ANSWER_COLUMNS = ["email", "question_number", "answer", "submitted_at"]
+
+
+class StorageBackend(ABC):
+    """
+    Persistence for answers and playground interactions.
+    The interactive path works with AnswerRecord/InteractionRecord objects;
+    DataFrames are only built for admin and analytics callers.
+    get_playground_interactions returns the raw log, with parameters still
+    JSON-encoded; src.data.storage flattens them for callers.
+    """
+
+    @abstractmethod
+    def save_answer(
+        self, email: str, question_number: int, answer: str, submitted_at: str
+    ) -> None:
+        """Insert or replace the answer for (email, question_number)."""
+
+    @abstractmethod
+    def get_answer_index(self, email: str) -> Dict[int, AnswerRecord]:
+        """Return the user's answers keyed by question_number."""
+
+    def answer_save_error(self, email: str) -> Optional[Exception]:
+        """
+        The last error of the user's deferred answer writes that keep failing
+        and are being retried, or None if every answer is stored.
+        """
+        return None
+
+    @abstractmethod
+    def save_draft(
+        self, draft: DraftRecord, on_stored: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Store a draft unless a newer one for the same question is stored.
+        on_stored is called once the draft, or a newer one, is durable.
+        """
+
+    @abstractmethod
+    def get_drafts(self, email: str) -> Dict[int, DraftRecord]:
+        """Return the user's stored drafts keyed by question_number."""
+
+    @abstractmethod
+    def delete_draft(self, email: str, question_number: int, before: str) -> None:
+        """Delete the stored draft of a question unless it is newer than before."""
+
+    @abstractmethod
+    def save_playground_interaction(self, record: InteractionRecord) -> None:
+        """Append one interaction record to the user's playground log."""
+
+    @abstractmethod
+    def get_playground_interactions(self, email: Optional[str] = None) -> pd.DataFrame:
+        """Return the raw log for one user, or for everyone if email is None."""
+
+    def compact_playground_interactions(self, email: str) -> int:
+        """Merge appended log records; returns how many were merged."""
+        return 0
+
+    @abstractmethod
+    def iter_answers(
+        self, since: Optional[str] = None, question_number: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every stored answer as a dict with ANSWER_COLUMNS, one at a time.
+        With since (an ISO timestamp), only answers submitted after it; with
+        question_number, only answers to that question.
+        """
+
+    @abstractmethod
+    def iter_playground_interactions(
+        self,
+        since: Optional[str] = None,
+        email: Optional[str] = None,
+        bodies: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every raw interaction record, one at a time.
+        With since (an ISO timestamp), only records stamped after it; with
+        email, only that user's. With bodies False, prompts and responses
+        stored apart from their record may be left as references, for
+        callers that need few of them; resolve_bodies fills those in.
+        """
+
+    def resolve_bodies(self, records: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+        """Fill in prompts and responses left as references."""
+        return records
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for deferred writes to be durable. Returns False on timeout."""
+        return True
@@ -0,0 +1,1042 @@
+import io
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import pandas as pd
+from botocore.exceptions import ClientError
+
+from ...config import (
+    S3_BUCKET,
+    ANSWERS_PREFIX,
+    DRAFTS_PREFIX,
+    PLAYGROUND_PREFIX,
+    PLAYGROUND_BLOB_PREFIX,
+    PLAYGROUND_BLOB_MIN_BYTES,
+    PLAYGROUND_BLOB_CACHE_ENTRIES,
+    ANSWER_CACHE_TTL,
+    PLAYGROUND_COMPACT_THRESHOLD,
+    ADMIN_FETCH_WORKERS,
+    WRITER_WORKERS,
+    WRITER_MAX_ATTEMPTS,
+    WRITER_BACKOFF_BASE,
+    WRITER_RETRY_SECONDS,
+)
+from ... import tracing
+from ...clients import get_s3_client
+from ..logformat import (
+    BlobCache,
+    blob_refs,
+    compress,
+    decode_object,
+    decompress,
+    encode_history,
+    encode_log_record,
+    encode_record,
+    inline_bodies,
+)
+from ..records import AnswerRecord, DraftRecord, InteractionRecord
+from ..writer import BackgroundWriter
+from .base import ANSWER_COLUMNS, StorageBackend
+
+
+def _error_code(error: ClientError) -> str:
+    return str(error.response.get("Error", {}).get("Code", ""))
+
+
+# S3 answers 412 when a conditional write loses a race, 409 when two overlap
+_CONFLICT_CODES = ("PreconditionFailed", "412", "ConditionalRequestConflict", "409")
+MANIFEST_MAX_ATTEMPTS = 5
+
+
+def _batches(items: Iterable[Any]) -> Iterator[list[Any]]:
+    """
+    Split items into lists sized for one round of concurrent requests,
+    consuming them lazily.
+    """
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, ADMIN_FETCH_WORKERS * 4))
+        if not batch:
+            return
+        yield batch
+
+
+def _unique_records(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Drop repeated interaction_ids, keeping the first copy. A compaction that
+    was interrupted before deleting its log records leaves them in both the
+    history and the log.
+    """
+    seen = set()
+    for record in records:
+        interaction_id = record.get("interaction_id")
+        if isinstance(interaction_id, str):
+            if interaction_id in seen:
+                continue
+            seen.add(interaction_id)
+        yield record
+
+
+def _merge_manifests(
+    remote: Dict[str, dict], local: Dict[str, dict]
+) -> Dict[str, dict]:
+    """Combine two manifests, keeping the newest entry for each question."""
+    merged = dict(remote)
+    for question, meta in local.items():
+        known = merged.get(question)
+        if known is None or known["submitted_at"] <= meta["submitted_at"]:
+            merged[question] = meta
+    return merged
+
+
+class _UserAnswers:
+    """Cached answers of one user and the manifest they were read from."""
+
+    __slots__ = ("etag", "validated_at", "manifest", "records")
+
+    def __init__(
+        self,
+        etag: Optional[str],
+        validated_at: float,
+        manifest: Dict[str, dict],
+        records: Dict[int, AnswerRecord],
+    ):
+        self.etag = etag
+        self.validated_at = validated_at
+        self.manifest = manifest
+        self.records = records
+
+
+def _modified_after(obj: Dict[str, Any], since: Optional[datetime]) -> bool:
+    # Objects are written after the records in them are stamped, so an object
+    # last modified before the watermark holds nothing newer than it
+    return (
+        since is None or obj.get("LastModified") is None or obj["LastModified"] > since
+    )
+
+
+def _is_interaction_object(key: str) -> bool:
+    return (
+        key.endswith("_interactions.jsonl.gz")
+        or key.endswith("_interactions.csv")
+        or "/log/" in key
+    )
+
+
+def _interaction_owner(key: str) -> str:
+    """The user whose playground history or log record this is."""
+    name = key[len(PLAYGROUND_PREFIX) :]
+    if "/log/" in name:
+        return name[: name.index("/log/")]
+    return name[: name.rindex("_interactions.")]
+
+
+def _legacy_owner(key: str) -> Optional[str]:
+    """The user whose pre-compression playground object this is, if it is one."""
+    if key.endswith("_interactions.csv") or ("/log/" in key and key.endswith(".json")):
+        return _interaction_owner(key)
+    return None
+
+
+class _TracedClient:
+    """Wrap a boto3 S3 client so each request is recorded as a span."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _call(self, operation: str, key: Optional[str], **kwargs):
+        with tracing.span(f"s3.{operation}", key=key) as span:
+            try:
+                response = getattr(self._client, operation)(**kwargs)
+            except ClientError as e:
+                span.status = _error_code(e)
+                raise
+            span.set(bytes=response.get("ContentLength", 0))
+            return response
+
+    def get_object(self, **kwargs):
+        return self._call("get_object", kwargs.get("Key"), **kwargs)
+
+    def head_object(self, **kwargs):
+        return self._call("head_object", kwargs.get("Key"), **kwargs)
+
+    def put_object(self, **kwargs):
+        with tracing.span("s3.put_object", key=kwargs.get("Key")) as span:
+            span.set(bytes=len(kwargs.get("Body", b"")))
+            try:
+                return self._client.put_object(**kwargs)
+            except ClientError as e:
+                span.status = _error_code(e)
+                raise
+
+    def list_objects_v2(self, **kwargs):
+        return self._call("list_objects_v2", kwargs.get("Prefix"), **kwargs)
+
+    def delete_objects(self, **kwargs):
+        return self._call("delete_objects", None, **kwargs)
+
+
+class S3Backend(StorageBackend):
+    """
+    Per-question answer objects, per-user compressed playground histories and
+    appended log records, and shared prompt/response blobs in an S3 bucket.
+    Answers are served from a write-through cache revalidated by ETag, and
+    all uploads except compaction go through a background writer.
+    """
+
+    def __init__(self, client=None, bucket: str = S3_BUCKET):
+        self.client = client or get_s3_client()
+        if tracing.enabled():
+            self.client = _TracedClient(self.client)
+        self.bucket = bucket
+        self.writer = BackgroundWriter(
+            self._put_object,
+            workers=WRITER_WORKERS,
+            max_attempts=WRITER_MAX_ATTEMPTS,
+            backoff_base=WRITER_BACKOFF_BASE,
+            retry_seconds=WRITER_RETRY_SECONDS,
+        )
+
+        # Write-through cache of each user's answers, keyed by email
+        self._answer_cache: Dict[str, _UserAnswers] = {}
+        self._answer_cache_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=ADMIN_FETCH_WORKERS)
+
+        # Playground blobs never change once written, so texts and the set of
+        # digests known to be stored are cached without revalidation
+        self._blob_cache = BlobCache(PLAYGROUND_BLOB_CACHE_ENTRIES)
+        self._stored_blobs: set[str] = set()
+        # Texts of blobs whose saves are still in the write queue
+        self._unwritten_blobs: Dict[str, str] = {}
+        self._blob_lock = threading.Lock()
+
+        # Admin-mode index of interaction objects: key -> (etag, records)
+        self._admin_cache: Dict[str, Tuple[Optional[str], list[Dict[str, Any]]]] = {}
+        self._admin_cache_lock = threading.Lock()
+
+        # Log records each user has outside their history, as last listed
+        # plus those written since, and users being compacted in the background
+        self._log_counts: Dict[str, int] = {}
+        self._compacting: set[str] = set()
+        self._compaction_lock = threading.Lock()
+        self._compactor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="playground-compactor"
+        )
+
+    def _put_object(self, key: str, body: bytes) -> Optional[str]:
+        response = self.client.put_object(Bucket=self.bucket, Key=key, Body=body)
+        return response.get("ETag")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return self.writer.flush(timeout)
+
+    # Answers: one object per question plus a small per-user manifest
+
+    def _legacy_answers_key(self, email: str) -> str:
+        return f"{ANSWERS_PREFIX}{email}_answers.csv"
+
+    def _answers_prefix(self, email: str) -> str:
+        return f"{ANSWERS_PREFIX}{email}/"
+
+    def _answer_key(self, email: str, question_number: int) -> str:
+        return f"{self._answers_prefix(email)}q{question_number}.json"
+
+    def _manifest_key(self, email: str) -> str:
+        return f"{self._answers_prefix(email)}manifest.json"
+
+    def _read_json(self, key: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """GET and decode a JSON object; None if it does not exist."""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if _error_code(e) in ("NoSuchKey", "404"):
+                return None
+            raise
+        return json.loads(response["Body"].read()), response.get("ETag")
+
+    def _read_answer(self, email: str, question_number: int) -> Optional[AnswerRecord]:
+        found = self._read_json(self._answer_key(email, question_number))
+        return AnswerRecord.from_dict(found[0]) if found is not None else None
+
+    def _cache_answers(
+        self, email: str, previous: Optional[_UserAnswers], state: _UserAnswers
+    ) -> _UserAnswers:
+        with self._answer_cache_lock:
+            current = self._answer_cache.get(email)
+            # A save may have replaced the entry while we were reading
+            if current is not previous:
+                return current
+            self._answer_cache[email] = state
+            return state
+
+    def _load_answers(self, email: str) -> _UserAnswers:
+        """
+        Return a user's answers, served from the cache when possible.
+        Entries older than ANSWER_CACHE_TTL are revalidated with a conditional
+        GET of the manifest; when it has changed, only question objects whose
+        ETag changed are downloaded, concurrently.
+        """
+        with self._answer_cache_lock:
+            entry = self._answer_cache.get(email)
+
+        if entry is not None:
+            # Unwritten saves, including failed ones still being retried, are
+            # newer than anything S3 can return
+            if self.writer.pending_under(self._answers_prefix(email)):
+                return entry
+            if time.monotonic() - entry.validated_at < ANSWER_CACHE_TTL:
+                return entry
+
+        request = {"Bucket": self.bucket, "Key": self._manifest_key(email)}
+        if entry is not None and entry.etag:
+            request["IfNoneMatch"] = entry.etag
+
+        try:
+            response = self.client.get_object(**request)
+            manifest = json.loads(response["Body"].read())["questions"]
+            etag = response.get("ETag")
+        except ClientError as e:
+            code = _error_code(e)
+            if entry is not None and code in ("304", "NotModified"):
+                with self._answer_cache_lock:
+                    entry.validated_at = time.monotonic()
+                return entry
+            if code in ("NoSuchKey", "404"):
+                return self._load_legacy_answers(email, entry)
+            # Transient failure: keep serving what we have, don't cache empty
+            return entry or _UserAnswers(None, 0.0, {}, {})
+        except Exception:
+            return entry or _UserAnswers(None, 0.0, {}, {})
+
+        records = {}
+        to_fetch = []
+        for question, meta in manifest.items():
+            question_number = int(question)
+            known = entry.manifest.get(question) if entry is not None else None
+            if known is not None and known.get("etag") == meta["etag"]:
+                records[question_number] = entry.records[question_number]
+            else:
+                to_fetch.append(question_number)
+
+        fetched = self._pool.map(lambda q: self._read_answer(email, q), to_fetch)
+        for question_number, record in zip(to_fetch, fetched):
+            if record is not None:
+                records[question_number] = record
+
+        state = _UserAnswers(etag, time.monotonic(), manifest, records)
+        return self._cache_answers(email, entry, state)
+
+    def _load_legacy_answers(
+        self, email: str, entry: Optional[_UserAnswers]
+    ) -> _UserAnswers:
+        """Read a pre-manifest answers CSV and move it to the new layout."""
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=self._legacy_answers_key(email)
+            )
+            body = response["Body"].read()
+            with tracing.span("s3.parse", key=self._legacy_answers_key(email)):
+                df = pd.read_csv(io.BytesIO(body))
+        except ClientError as e:
+            if _error_code(e) not in ("NoSuchKey", "404"):
+                return entry or _UserAnswers(None, 0.0, {}, {})
+            df = pd.DataFrame(columns=ANSWER_COLUMNS)
+        except Exception:
+            return entry or _UserAnswers(None, 0.0, {}, {})
+
+        records = {}
+        for row in df.to_dict("records"):
+            record = AnswerRecord.from_dict(row)
+            records[record.question_number] = record
+
+        state = _UserAnswers(None, time.monotonic(), {}, records)
+        state = self._cache_answers(email, entry, state)
+        for record in records.values():
+            self._submit_answer(email, record)
+        return state
+
+    def save_answer(
+        self, email: str, question_number: int, answer: str, submitted_at: str
+    ) -> None:
+        """
+        Writes only this question's object, then merges it into the manifest
+        with an ETag-conditional PUT, so saves from two tabs cannot overwrite
+        each other. The cache is updated immediately and both uploads happen
+        on the background writer, which keeps retrying them until they land.
+        Raises if earlier answers of this user have failed to upload.
+        """
+        record = AnswerRecord(email, question_number, answer, submitted_at)
+
+        previous = self._load_answers(email)
+        with self._answer_cache_lock:
+            previous = self._answer_cache.get(email, previous)
+            manifest = dict(previous.manifest)
+            manifest[str(question_number)] = {
+                "submitted_at": submitted_at,
+                "etag": None,
+            }
+            self._answer_cache[email] = _UserAnswers(
+                previous.etag,
+                previous.validated_at,
+                manifest,
+                {**previous.records, question_number: record},
+            )
+
+        self._submit_answer(email, record)
+        error = self.answer_save_error(email)
+        if error is not None:
+            raise RuntimeError(
+                f"Some answers could not be saved yet and are being retried: {error}"
+            )
+
+    def answer_save_error(self, email: str) -> Optional[Exception]:
+        errors = self.writer.failed_under(self._answers_prefix(email))
+        return next(iter(errors.values()), None)
+
+    def _submit_answer(self, email: str, record: AnswerRecord) -> None:
+        def written(etag: Optional[str]) -> None:
+            self._answer_written(
+                email, record.question_number, record.submitted_at, etag
+            )
+
+        self.writer.submit(
+            self._answer_key(email, record.question_number),
+            json.dumps(record.to_dict()).encode(),
+            on_success=written,
+            keep=True,
+        )
+
+    def _answer_written(
+        self, email: str, question_number: int, submitted_at: str, etag: str
+    ) -> None:
+        """Record the new object's ETag and queue a manifest update."""
+        question = str(question_number)
+        meta = {"submitted_at": submitted_at, "etag": etag}
+        with self._answer_cache_lock:
+            state = self._answer_cache.get(email)
+            if state is None:
+                local = {question: meta}
+            else:
+                known = state.manifest.get(question)
+                if known is None or known["submitted_at"] <= submitted_at:
+                    state.manifest[question] = meta
+                local = {q: m for q, m in state.manifest.items() if m["etag"]}
+
+        self.writer.submit(
+            self._manifest_key(email),
+            json.dumps({"questions": local}).encode(),
+            write=lambda key, body: self._write_manifest(email, key, body),
+            keep=True,
+        )
+
+    def _write_manifest(self, email: str, key: str, body: bytes) -> Optional[str]:
+        """
+        Merge our manifest entries into the stored manifest.
+        The PUT is conditional on the ETag just read, so a concurrent update
+        makes it fail with 412 and the merge is redone against the new copy.
+        """
+        local = json.loads(body)["questions"]
+        for _ in range(MANIFEST_MAX_ATTEMPTS):
+            found = self._read_json(key)
+            if found is None:
+                remote, condition = {}, {"IfNoneMatch": "*"}
+            else:
+                remote, condition = found[0]["questions"], {"IfMatch": found[1]}
+
+            merged = _merge_manifests(remote, local)
+            try:
+                response = self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=json.dumps({"questions": merged}),
+                    **condition,
+                )
+            except ClientError as e:
+                if _error_code(e) in _CONFLICT_CODES:
+                    continue
+                raise
+
+            etag = response.get("ETag")
+            with self._answer_cache_lock:
+                state = self._answer_cache.get(email)
+                if state is not None:
+                    if merged == state.manifest:
+                        state.etag = etag
+                    else:
+                        # Another writer added entries; reload on next read
+                        state.validated_at = 0.0
+            return etag
+
+        raise RuntimeError(f"Gave up updating {key} after repeated conflicts")
+
+    def get_answer_index(self, email: str) -> Dict[int, AnswerRecord]:
+        return self._load_answers(email).records
+
+    # Drafts: one small object per question, newest wins
+
+    def _draft_prefix(self, email: str) -> str:
+        return f"{DRAFTS_PREFIX}{email}/"
+
+    def _draft_key(self, email: str, question_number: int) -> str:
+        return f"{self._draft_prefix(email)}q{question_number}.json"
+
+    def save_draft(
+        self, draft: DraftRecord, on_stored: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Queued on the background writer, which keeps only the newest body per
+        key. The PUT is conditional on the stored draft being older, so a
+        draft replayed from a journal never overwrites a newer one.
+        """
+        self.writer.submit(
+            self._draft_key(draft.email, draft.question_number),
+            json.dumps(draft.to_dict()).encode(),
+            on_success=None if on_stored is None else lambda etag: on_stored(),
+            write=self._write_draft,
+        )
+
+    def _write_draft(self, key: str, body: bytes) -> Optional[str]:
+        updated_at = json.loads(body)["updated_at"]
+        for _ in range(MANIFEST_MAX_ATTEMPTS):
+            found = self._read_json(key)
+            if found is None:
+                condition = {"IfNoneMatch": "*"}
+            elif found[0]["updated_at"] >= updated_at:
+                return found[1]
+            else:
+                condition = {"IfMatch": found[1]}
+            try:
+                response = self.client.put_object(
+                    Bucket=self.bucket, Key=key, Body=body, **condition
+                )
+            except ClientError as e:
+                if _error_code(e) in _CONFLICT_CODES:
+                    continue
+                raise
+            return response.get("ETag")
+
+        raise RuntimeError(f"Gave up updating {key} after repeated conflicts")
+
+    def delete_draft(self, email: str, question_number: int, before: str) -> None:
+        """
+        Queued on the background writer with an empty body, which replaces an
+        older queued draft for the question; a newer one is left to be saved.
+        """
+        key = self._draft_key(email, question_number)
+        pending = self.writer.pending(key)
+        if pending and json.loads(pending)["updated_at"] > before:
+            return
+        self.writer.submit(
+            key, b"", write=lambda key, body: self._delete_draft(key, before)
+        )
+
+    def _delete_draft(self, key: str, before: str) -> Optional[str]:
+        found = self._read_json(key)
+        if found is not None and found[0]["updated_at"] <= before:
+            self.client.delete_objects(
+                Bucket=self.bucket, Delete={"Objects": [{"Key": key}], "Quiet": True}
+            )
+        return None
+
+    def get_drafts(self, email: str) -> Dict[int, DraftRecord]:
+        prefix = self._draft_prefix(email)
+        pending = self.writer.pending_under(prefix)
+        # Queued deletes have empty bodies
+        deleted = {key for key, body in pending.items() if not body}
+        objects = (
+            obj for obj in self._iter_objects(prefix) if obj["Key"] not in deleted
+        )
+        drafts = {}
+        for key, body in self._read_with_pending(objects, pending):
+            if key in deleted:
+                continue
+            draft = DraftRecord.from_dict(json.loads(body))
+            known = drafts.get(draft.question_number)
+            if known is None or known.updated_at < draft.updated_at:
+                drafts[draft.question_number] = draft
+        return drafts
+
+    # Playground interactions
+
+    def _interactions_key(self, email: str) -> str:
+        return f"{PLAYGROUND_PREFIX}{email}_interactions.jsonl.gz"
+
+    def _legacy_interactions_key(self, email: str) -> str:
+        return f"{PLAYGROUND_PREFIX}{email}_interactions.csv"
+
+    def _interaction_log_prefix(self, email: str) -> str:
+        return f"{PLAYGROUND_PREFIX}{email}/log/"
+
+    def _blob_key(self, ref: str) -> str:
+        return f"{PLAYGROUND_BLOB_PREFIX}{ref}.txt.gz"
+
+    def _iter_objects(self, prefix: str) -> Iterator[Dict[str, Any]]:
+        """Yield every object under a prefix, following continuation tokens."""
+        request = {"Bucket": self.bucket, "Prefix": prefix}
+        while True:
+            page = self.client.list_objects_v2(**request)
+            yield from page.get("Contents", [])
+            if not page.get("IsTruncated"):
+                return
+            request["ContinuationToken"] = page["NextContinuationToken"]
+
+    def _list_objects(self, prefix: str) -> list[Dict[str, Any]]:
+        return list(self._iter_objects(prefix))
+
+    def _decode(self, key: str, body: bytes) -> list[Dict[str, Any]]:
+        with tracing.span("s3.parse", key=key, bytes=len(body)):
+            return decode_object(key, body)
+
+    def _put_blob(self, ref: str, text: str) -> None:
+        """Store a blob, unless this process already knows it is stored."""
+        if ref in self._stored_blobs:
+            return
+        try:
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._blob_key(ref),
+                Body=compress(text.encode()),
+                IfNoneMatch="*",
+            )
+        except ClientError as e:
+            # Another save stored the same text first
+            if _error_code(e) not in ("PreconditionFailed", "412"):
+                raise
+        self._blob_cache.set(ref, text)
+        with self._blob_lock:
+            self._stored_blobs.add(ref)
+            self._unwritten_blobs.pop(ref, None)
+
+    def _read_blob(self, ref: str) -> Optional[str]:
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=self._blob_key(ref)
+            )
+        except ClientError as e:
+            if _error_code(e) not in ("NoSuchKey", "404"):
+                raise
+            print(f"Error reading playground blob {ref}: not found")
+            return None
+        text = decompress(response["Body"].read()).decode()
+        self._blob_cache.set(ref, text)
+        with self._blob_lock:
+            self._stored_blobs.add(ref)
+        return text
+
+    def _blob_texts(self, refs: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Look up blob texts, downloading the ones not in memory concurrently."""
+        with self._blob_lock:
+            texts = {
+                ref: self._unwritten_blobs[ref]
+                for ref in refs
+                if ref in self._unwritten_blobs
+            }
+        missing = []
+        for ref in refs:
+            if ref not in texts:
+                text = self._blob_cache.get(ref)
+                if text is None:
+                    missing.append(ref)
+                else:
+                    texts[ref] = text
+        texts.update(zip(missing, self._pool.map(self._read_blob, missing)))
+        return texts
+
+    def resolve_bodies(self, records: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+        return inline_bodies(records, self._blob_texts(blob_refs(records)))
+
+    def save_playground_interaction(self, record: InteractionRecord) -> None:
+        """
+        Each interaction is written as its own small compressed log object, so
+        a save costs one PUT no matter how long the user's history is, plus
+        one for each long prompt or response not already stored. The PUTs
+        happen on the background writer, blobs before the record.
+        """
+        stored, blobs = encode_record(record.to_dict(), PLAYGROUND_BLOB_MIN_BYTES)
+        with self._blob_lock:
+            blobs = {
+                ref: text
+                for ref, text in blobs.items()
+                if ref not in self._stored_blobs
+            }
+            self._unwritten_blobs.update(blobs)
+
+        def write(key: str, body: bytes) -> Optional[str]:
+            for ref, text in blobs.items():
+                self._put_blob(ref, text)
+            return self._put_object(key, body)
+
+        # Timestamped keys list in write order
+        stamp = datetime.fromisoformat(record.timestamp).strftime("%Y%m%dT%H%M%S%f")
+        key = (
+            f"{self._interaction_log_prefix(record.email)}"
+            f"{stamp}-{record.interaction_id[:8]}.json.gz"
+        )
+        self.writer.submit(
+            key,
+            encode_log_record(stored),
+            on_success=lambda etag: self._logged(record.email),
+            write=write,
+        )
+
+    def _logged(self, email: str) -> None:
+        """
+        Count a log record written; once a user has PLAYGROUND_COMPACT_THRESHOLD
+        of them, their log is compacted in the background.
+        """
+        with self._compaction_lock:
+            count = self._log_counts[email] = self._log_counts.get(email, 0) + 1
+            if count < PLAYGROUND_COMPACT_THRESHOLD or email in self._compacting:
+                return
+            self._compacting.add(email)
+        self._compactor.submit(self._compact_in_background, email)
+
+    def _compact_in_background(self, email: str) -> None:
+        try:
+            self.compact_playground_interactions(email)
+        except Exception as e:
+            print(f"Error compacting playground log for {email}: {str(e)}")
+        finally:
+            with self._compaction_lock:
+                self._compacting.discard(email)
+
+    def _compacted(self, email: str, folded: int) -> None:
+        with self._compaction_lock:
+            # Records written while the compaction ran are still in the log
+            count = self._log_counts.get(email, 0)
+            self._log_counts[email] = max(0, count - folded)
+
+    def _read_user_interactions(
+        self, email: str
+    ) -> Tuple[list[Dict[str, Any]], list[str], Optional[str]]:
+        """
+        Read a user's compacted history plus any log records appended since,
+        with blob references still in place. Returns the records, the keys a
+        compaction would fold away and the listed ETag of the history.
+        """
+        history_key = self._interactions_key(email)
+        legacy_key = self._legacy_interactions_key(email)
+        log_prefix = self._interaction_log_prefix(email)
+        pending = self.writer.pending_under(log_prefix)
+        # One listing finds the history and the log; the prefix also matches
+        # other users whose address starts with this one
+        objects = [
+            obj
+            for obj in self._iter_objects(f"{PLAYGROUND_PREFIX}{email}")
+            if obj["Key"] in (history_key, legacy_key)
+            or obj["Key"].startswith(log_prefix)
+        ]
+        # Histories first, so rows stay in the order they were written
+        objects.sort(key=lambda obj: obj["Key"] not in (history_key, legacy_key))
+
+        records = []
+        for key, body in self._read_with_pending(objects, pending):
+            records.extend(self._decode(key, body))
+
+        folded = [obj["Key"] for obj in objects if obj["Key"] != history_key]
+        history_etag = next(
+            (obj.get("ETag") for obj in objects if obj["Key"] == history_key), None
+        )
+        return records, folded, history_etag
+
+    def _write_compacted(
+        self,
+        email: str,
+        records: list[Dict[str, Any]],
+        folded: list[str],
+        history_etag: Optional[str],
+    ) -> bool:
+        """
+        Write records as the user's compressed history, then delete the log
+        records and legacy CSV folded into it. The PUT is conditional on the
+        history read, so if another compaction replaced it meanwhile nothing
+        is written or deleted and False is returned.
+        """
+        stored = []
+        blobs = {}
+        for record in records:
+            record, record_blobs = encode_record(record, PLAYGROUND_BLOB_MIN_BYTES)
+            stored.append(record)
+            blobs.update(record_blobs)
+        # Legacy records carry their bodies inline; store them as blobs first
+        list(self._pool.map(lambda item: self._put_blob(*item), blobs.items()))
+
+        if history_etag is None:
+            condition = {"IfNoneMatch": "*"}
+        else:
+            condition = {"IfMatch": history_etag}
+        try:
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._interactions_key(email),
+                Body=encode_history(stored),
+                **condition,
+            )
+        except ClientError as e:
+            if _error_code(e) in _CONFLICT_CODES:
+                return False
+            raise
+        # delete_objects accepts at most 1000 keys per call
+        for start in range(0, len(folded), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={
+                    "Objects": [{"Key": key} for key in folded[start : start + 1000]],
+                    "Quiet": True,
+                },
+            )
+        return True
+
+    def compact_playground_interactions(self, email: str) -> int:
+        """
+        Fold the user's log records, and a legacy CSV history if there is
+        one, into their compressed history. Returns the number of objects
+        folded. A compaction that races another is redone from a fresh read.
+        """
+        for _ in range(MANIFEST_MAX_ATTEMPTS):
+            try:
+                records, folded, history_etag = self._read_user_interactions(email)
+            except ClientError as e:
+                # A concurrent compaction deleted a log record just listed
+                if _error_code(e) in ("NoSuchKey", "404"):
+                    continue
+                raise
+            if not folded:
+                return 0
+            if self._write_compacted(
+                email, list(_unique_records(records)), folded, history_etag
+            ):
+                self._compacted(email, len(folded))
+                return len(folded)
+
+        raise RuntimeError(
+            f"Gave up compacting playground history of {email} after repeated "
+            "conflicts"
+        )
+
+    def iter_legacy_playground_objects(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (email, listed object) for every pre-compression object."""
+        for obj in self._iter_objects(PLAYGROUND_PREFIX):
+            email = _legacy_owner(obj["Key"])
+            if email is not None:
+                yield email, obj
+
+    def stored_bytes(self, prefix: str) -> int:
+        """Total size of the objects under a prefix."""
+        return sum(obj.get("Size", 0) for obj in self._iter_objects(prefix))
+
+    def _user_records(self, email: str) -> list[Dict[str, Any]]:
+        """
+        A user's interaction records, with blob references still in place.
+        A log of PLAYGROUND_COMPACT_THRESHOLD or more records is compacted
+        from what was just read.
+        """
+        records, folded, history_etag = self._read_user_interactions(email)
+        records = list(_unique_records(records))
+        with self._compaction_lock:
+            self._log_counts[email] = len(folded)
+        # If this loses to another compaction, that one folded the log
+        if len(folded) >= PLAYGROUND_COMPACT_THRESHOLD and self._write_compacted(
+            email, records, folded, history_etag
+        ):
+            self._compacted(email, len(folded))
+        return records
+
+    def _load_user_interactions(self, email: str) -> pd.DataFrame:
+        records = self._user_records(email)
+        if not records:
+            return pd.DataFrame()
+        return pd.DataFrame(self.resolve_bodies(records))
+
+    def _load_all_interactions(self) -> pd.DataFrame:
+        """
+        Read every interaction object in the bucket for admin mode.
+        Objects whose ETag matches the local index are served from memory, and
+        the rest are downloaded concurrently.
+        """
+        listed = [
+            obj
+            for obj in self._list_objects(PLAYGROUND_PREFIX)
+            if _is_interaction_object(obj["Key"])
+        ]
+
+        with self._admin_cache_lock:
+            stale = [
+                obj
+                for obj in listed
+                if self._admin_cache.get(obj["Key"], (None,))[0] != obj.get("ETag")
+            ]
+
+        fetched = {}
+        if stale:
+            decoded = {
+                key: self._decode(key, body) for key, body in self._read_many(stale)
+            }
+            texts = self._blob_texts(
+                blob_refs(itertools.chain.from_iterable(decoded.values()))
+            )
+            for obj in stale:
+                records = inline_bodies(decoded[obj["Key"]], texts)
+                fetched[obj["Key"]] = (obj.get("ETag"), records)
+
+        with self._admin_cache_lock:
+            self._admin_cache.update(fetched)
+            # Forget objects that were compacted away or deleted
+            listed_keys = {obj["Key"] for obj in listed}
+            for key in list(self._admin_cache):
+                if key not in listed_keys:
+                    del self._admin_cache[key]
+            cached = [self._admin_cache[obj["Key"]][1] for obj in listed]
+
+        records = list(_unique_records(itertools.chain.from_iterable(cached)))
+        return pd.DataFrame(records) if records else pd.DataFrame()
+
+    def get_playground_interactions(self, email: Optional[str] = None) -> pd.DataFrame:
+        if email:
+            df = self._load_user_interactions(email)
+        else:
+            df = self._load_all_interactions()
+        return df.drop(columns="interaction_id", errors="ignore")
+
+    # Bulk export
+
+    def _read_many(
+        self, objects: Iterable[Dict[str, Any]]
+    ) -> Iterator[Tuple[str, bytes]]:
+        """
+        Download objects concurrently, a bounded batch at a time, yielding
+        (key, body) in listing order.
+        """
+
+        def read(key: str) -> bytes:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+        for batch in _batches(obj["Key"] for obj in objects):
+            yield from zip(batch, self._pool.map(read, batch))
+
+    def _read_with_pending(
+        self, objects: Iterable[Dict[str, Any]], pending: Dict[str, bytes]
+    ) -> Iterator[Tuple[str, bytes]]:
+        """
+        Download listed objects, then yield the bodies still in the write
+        queue that the listing did not include. pending must be taken before
+        listing, so a write finishing in between is in one or the other.
+        """
+        listed = set()
+
+        def listing() -> Iterator[Dict[str, Any]]:
+            for obj in objects:
+                listed.add(obj["Key"])
+                yield obj
+
+        yield from self._read_many(listing())
+        for key in sorted(set(pending) - listed):
+            yield key, pending[key]
+
+    def iter_answers(
+        self, since: Optional[str] = None, question_number: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        since_at = datetime.fromisoformat(since).astimezone() if since else None
+        # Keys name their question, so other questions are never downloaded
+        suffix = f"/q{question_number}.json" if question_number is not None else ".json"
+        answer_objects = (
+            obj
+            for obj in self._iter_objects(ANSWERS_PREFIX)
+            if obj["Key"].endswith(suffix)
+            and not obj["Key"].endswith("/manifest.json")
+            and _modified_after(obj, since_at)
+        )
+        for _, body in self._read_many(answer_objects):
+            record = json.loads(body)
+            if not since or record["submitted_at"] > since:
+                yield record
+
+        # Users who have not logged in since the per-question layout shipped,
+        # found with a second listing so nothing is held per user
+        legacy = (
+            obj
+            for obj in self._iter_objects(ANSWERS_PREFIX)
+            if obj["Key"].endswith("_answers.csv") and _modified_after(obj, since_at)
+        )
+        for _, body in self._read_many(self._unmigrated(legacy)):
+            for record in pd.read_csv(io.BytesIO(body)).to_dict("records"):
+                if question_number is not None and (
+                    record["question_number"] != question_number
+                ):
+                    continue
+                if not since or record["submitted_at"] > since:
+                    yield record
+
+    def _has_manifest(self, email: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._manifest_key(email))
+        except ClientError as e:
+            if _error_code(e) in ("NoSuchKey", "404", "NotFound"):
+                return False
+            raise
+        return True
+
+    def _unmigrated(self, legacy: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        The legacy answer CSVs whose user has no manifest yet, checked
+        concurrently a bounded batch at a time.
+        """
+        for batch in _batches(legacy):
+            emails = [
+                obj["Key"][len(ANSWERS_PREFIX) : -len("_answers.csv")] for obj in batch
+            ]
+            for obj, migrated in zip(batch, self._pool.map(self._has_manifest, emails)):
+                if not migrated:
+                    yield obj
+
+    def iter_playground_interactions(
+        self,
+        since: Optional[str] = None,
+        email: Optional[str] = None,
+        bodies: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        A user's records are read at once, compacting their log if it is
+        long; everyone's are streamed object by object.
+        """
+        if email:
+            records = self._user_records(email)
+        else:
+            records = self._iter_all_records(since)
+        if since:
+            records = (record for record in records if record["timestamp"] > since)
+        if not bodies:
+            yield from records
+            return
+
+        # Inline blobs a batch of records at a time, so one round of
+        # concurrent GETs serves many records
+        for batch in _batches(records):
+            yield from self.resolve_bodies(batch)
+
+    def _iter_all_records(self, since: Optional[str]) -> Iterator[Dict[str, Any]]:
+        since_at = datetime.fromisoformat(since).astimezone() if since else None
+        objects = (
+            obj
+            for obj in self._iter_objects(PLAYGROUND_PREFIX)
+            if _is_interaction_object(obj["Key"]) and _modified_after(obj, since_at)
+        )
+        # An interrupted compaction leaves records in a user's history and
+        # log, which list next to each other, so ids are only remembered while
+        # one user's objects stream past
+        for _, bodies in itertools.groupby(
+            self._read_many(objects), key=lambda item: _interaction_owner(item[0])
+        ):
+            yield from _unique_records(
+                itertools.chain.from_iterable(
+                    decode_object(key, body) for key, body in bodies
+                )
+            )
@@ -0,0 +1,228 @@
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import pandas as pd
+
+from ...config import SQLITE_PATH
+from ..records import AnswerRecord, DraftRecord, InteractionRecord
+from .base import ANSWER_COLUMNS, StorageBackend
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    email TEXT NOT NULL,
+    question_number INTEGER NOT NULL,
+    answer TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    PRIMARY KEY (email, question_number)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS drafts (
+    email TEXT NOT NULL,
+    question_number INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (email, question_number)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS playground_interactions (
+    id INTEGER PRIMARY KEY,
+    interaction_id TEXT UNIQUE,
+    email TEXT NOT NULL,
+    question_number INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    parameters TEXT NOT NULL,
+    response TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS playground_interactions_by_user
+    ON playground_interactions (email, question_number);
+"""
+
+# Call telemetry columns, added to existing databases when they are opened
+_TELEMETRY_COLUMNS = {
+    "prompt_tokens": "INTEGER",
+    "completion_tokens": "INTEGER",
+    "total_tokens": "INTEGER",
+    "latency_ms": "REAL",
+    "first_token_ms": "REAL",
+    "finish_reason": "TEXT",
+    "system_fingerprint": "TEXT",
+}
+
+_INTERACTION_COLUMNS = [
+    "email",
+    "question_number",
+    "prompt",
+    "parameters",
+    "response",
+    "timestamp",
+    *_TELEMETRY_COLUMNS,
+]
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Answers and playground interactions in a local SQLite database.
+    The database runs in WAL mode so readers never block the writer, answers
+    are keyed on (email, question_number) and saved with a single-row upsert,
+    and each thread keeps its own connection.
+    """
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        connection = self._connection()
+        connection.executescript(_SCHEMA)
+        existing = {
+            row[1]
+            for row in connection.execute("PRAGMA table_info(playground_interactions)")
+        }
+        for column, column_type in _TELEMETRY_COLUMNS.items():
+            if column not in existing:
+                connection.execute(
+                    f"ALTER TABLE playground_interactions ADD COLUMN {column} {column_type}"
+                )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def save_answer(
+        self, email: str, question_number: int, answer: str, submitted_at: str
+    ) -> None:
+        self._connection().execute(
+            """
+            INSERT INTO answers (email, question_number, answer, submitted_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (email, question_number)
+            DO UPDATE SET answer = excluded.answer, submitted_at = excluded.submitted_at
+            """,
+            (email, question_number, answer, submitted_at),
+        )
+
+    def get_answer_index(self, email: str) -> Dict[int, AnswerRecord]:
+        rows = self._connection().execute(
+            f"SELECT {', '.join(ANSWER_COLUMNS)} FROM answers"
+            " WHERE email = ? ORDER BY question_number",
+            (email,),
+        )
+        return {row[1]: AnswerRecord(*row) for row in rows}
+
+    def save_draft(
+        self, draft: DraftRecord, on_stored: Optional[Callable[[], None]] = None
+    ) -> None:
+        self._connection().execute(
+            """
+            INSERT INTO drafts (email, question_number, text, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (email, question_number)
+            DO UPDATE SET text = excluded.text, updated_at = excluded.updated_at
+            WHERE excluded.updated_at > drafts.updated_at
+            """,
+            (draft.email, draft.question_number, draft.text, draft.updated_at),
+        )
+        if on_stored is not None:
+            on_stored()
+
+    def get_drafts(self, email: str) -> Dict[int, DraftRecord]:
+        rows = self._connection().execute(
+            "SELECT email, question_number, text, updated_at FROM drafts"
+            " WHERE email = ?",
+            (email,),
+        )
+        return {row[1]: DraftRecord(*row) for row in rows}
+
+    def delete_draft(self, email: str, question_number: int, before: str) -> None:
+        self._connection().execute(
+            "DELETE FROM drafts"
+            " WHERE email = ? AND question_number = ? AND updated_at <= ?",
+            (email, question_number, before),
+        )
+
+    def save_playground_interaction(self, record: InteractionRecord) -> None:
+        columns = ["interaction_id", *_INTERACTION_COLUMNS]
+        values = record.to_dict()
+        self._connection().execute(
+            f"INSERT OR IGNORE INTO playground_interactions ({', '.join(columns)})"
+            f" VALUES ({', '.join('?' * len(columns))})",
+            [values[column] for column in columns],
+        )
+
+    def get_playground_interactions(self, email: Optional[str] = None) -> pd.DataFrame:
+        query = f"SELECT {', '.join(_INTERACTION_COLUMNS)} FROM playground_interactions"
+        params: tuple = ()
+        if email:
+            query += " WHERE email = ?"
+            params = (email,)
+        rows = self._connection().execute(query + " ORDER BY id", params).fetchall()
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame(rows, columns=_INTERACTION_COLUMNS)
+
+    def _iter_rows(
+        self,
+        table: str,
+        columns: list[str],
+        time_column: str,
+        since: Optional[str],
+        email: Optional[str] = None,
+        question_number: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        query = f"SELECT {', '.join(columns)} FROM {table}"
+        conditions = []
+        params: tuple = ()
+        if since:
+            conditions.append(f"{time_column} > ?")
+            params += (since,)
+        if email:
+            conditions.append("email = ?")
+            params += (email,)
+        if question_number is not None:
+            conditions.append("question_number = ?")
+            params += (question_number,)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        # A dedicated connection keeps the cursor open while the caller
+        # consumes rows without holding up this thread's writes
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            for row in connection.execute(query, params):
+                yield dict(zip(columns, row))
+        finally:
+            connection.close()
+
+    def iter_answers(
+        self, since: Optional[str] = None, question_number: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        return self._iter_rows(
+            "answers",
+            ANSWER_COLUMNS,
+            "submitted_at",
+            since,
+            question_number=question_number,
+        )
+
+    def iter_playground_interactions(
+        self,
+        since: Optional[str] = None,
+        email: Optional[str] = None,
+        bodies: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        return self._iter_rows(
+            "playground_interactions",
+            ["interaction_id", *_INTERACTION_COLUMNS],
+            "timestamp",
+            since,
+            email,
+        )
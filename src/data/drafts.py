@@ -0,0 +1,259 @@
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from ..config import (
+    DRAFT_JOURNAL_PATH,
+    DRAFT_DEBOUNCE_SECONDS,
+    DRAFT_FLUSH_SECONDS,
+    DRAFT_JOURNAL_MAX_BYTES,
+)
+from .backends import get_backend
+from .backends.base import StorageBackend
+from .records import DraftRecord
+
+DraftKey = Tuple[str, int]
+
+
+def _marker(kind: str, draft: DraftRecord) -> Dict[str, Any]:
+    """
+    A journal line saying a draft, and any older one for the same question,
+    no longer needs storing: it was "stored", or "dropped" by a submit.
+    """
+    return {
+        "marker": kind,
+        "email": draft.email,
+        "question_number": draft.question_number,
+        "updated_at": draft.updated_at,
+    }
+
+
+class DraftJournal:
+    """
+    Answer drafts, accepted without blocking and persisted in the background.
+    A worker thread appends new drafts to a local append-only journal at most
+    every debounce_seconds, so drafts survive a restart, and sends them to the
+    storage backend in batches every flush_seconds or when a user submits.
+    Stored and dropped drafts are marked in the journal, so on start it is
+    replayed and only drafts not yet known to be stored are sent again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        backend: Callable[[], StorageBackend] = get_backend,
+        debounce_seconds: float = DRAFT_DEBOUNCE_SECONDS,
+        flush_seconds: float = DRAFT_FLUSH_SECONDS,
+        max_bytes: int = DRAFT_JOURNAL_MAX_BYTES,
+    ):
+        self.path = path
+        self._backend = backend
+        self.debounce_seconds = debounce_seconds
+        self.flush_seconds = flush_seconds
+        self.max_bytes = max_bytes
+        self._cond = threading.Condition()
+        # Newest draft per (email, question_number) not yet journaled, and
+        # not yet handed to the backend
+        self._unjournaled: Dict[DraftKey, DraftRecord] = {}
+        self._unstored: Dict[DraftKey, DraftRecord] = {}
+        # Stored and dropped markers not yet journaled
+        self._markers: list[Dict[str, Any]] = []
+        # Users whose drafts should be sent on the next wake-up
+        self._flush_requested: set[str] = set()
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._unstored.update(self._replay())
+        self._rewrite(self._unstored.values())
+
+        self._thread = threading.Thread(
+            target=self._run, name="draft-journal", daemon=True
+        )
+        self._thread.start()
+
+    def _replay(self) -> Dict[DraftKey, DraftRecord]:
+        drafts: Dict[DraftKey, DraftRecord] = {}
+        # Newest updated_at per question marked stored or dropped
+        settled: Dict[DraftKey, str] = {}
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        data = json.loads(line)
+                        key = (data["email"], int(data["question_number"]))
+                        updated_at = str(data["updated_at"])
+                        if "marker" not in data:
+                            draft = DraftRecord.from_dict(data)
+                    except (ValueError, KeyError, TypeError):
+                        # A line cut short by a crash
+                        continue
+                    if "marker" in data:
+                        settled[key] = max(settled.get(key, ""), updated_at)
+                    elif key not in drafts or drafts[key].updated_at < updated_at:
+                        drafts[key] = draft
+        except FileNotFoundError:
+            pass
+        return {
+            key: draft
+            for key, draft in drafts.items()
+            if settled.get(key, "") < draft.updated_at
+        }
+
+    def _append(self, entries: Iterable[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(entry) + "\n" for entry in entries)
+        if not lines:
+            return
+        with open(self.path, "a") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite(self, drafts: Iterable[DraftRecord]) -> None:
+        """Replace the journal with just these drafts."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            for draft in drafts:
+                f.write(json.dumps(draft.to_dict()) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def record(self, email: str, question_number: int, text: str) -> DraftRecord:
+        """Accept a draft; it is journaled and stored in the background."""
+        draft = DraftRecord(email, question_number, text, datetime.now().isoformat())
+        key = (email, question_number)
+        with self._cond:
+            self._unjournaled[key] = draft
+            self._unstored[key] = draft
+        return draft
+
+    def request_flush(self, email: str, submitted: Optional[int] = None) -> None:
+        """
+        Send the user's drafts to storage now, without waiting for it. The
+        draft of a question just submitted is dropped; the answer supersedes it.
+        """
+        with self._cond:
+            if submitted is not None:
+                self._unjournaled.pop((email, submitted), None)
+                self._unstored.pop((email, submitted), None)
+                # Also settles a draft already handed to the backend, whose
+                # write the answer's delete may replace before it is marked
+                dropped = DraftRecord(email, submitted, "", datetime.now().isoformat())
+                self._markers.append(_marker("dropped", dropped))
+            self._flush_requested.add(email)
+            self._cond.notify()
+
+    def unstored(self, email: str) -> Dict[int, DraftRecord]:
+        """The user's drafts that storage may not have yet."""
+        with self._cond:
+            return {
+                question_number: draft
+                for (owner, question_number), draft in self._unstored.items()
+                if owner == email
+            }
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Journal and store outstanding drafts, then stop the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        next_flush = time.monotonic() + self.flush_seconds
+        while True:
+            with self._cond:
+                if not self._closed and not self._flush_requested:
+                    self._cond.wait(self.debounce_seconds)
+                entries = [draft.to_dict() for draft in self._unjournaled.values()]
+                entries.extend(self._markers)
+                self._unjournaled.clear()
+                self._markers = []
+                closed = self._closed
+                flush_all = closed or time.monotonic() >= next_flush
+                users = self._flush_requested
+                self._flush_requested = set()
+                to_store = {
+                    key: draft
+                    for key, draft in self._unstored.items()
+                    if flush_all or key[0] in users
+                }
+
+            self._journal(entries)
+            if to_store:
+                self._store(to_store)
+            if flush_all:
+                next_flush = time.monotonic() + self.flush_seconds
+                self._compact()
+            if closed:
+                # Journal the markers of the writes just sent, once they land
+                self._backend().flush(self.flush_seconds)
+                with self._cond:
+                    entries, self._markers = self._markers, []
+                self._journal(entries)
+                return
+
+    def _journal(self, entries: list[Dict[str, Any]]) -> None:
+        try:
+            self._append(entries)
+        except OSError as e:
+            print(f"Error writing draft journal: {str(e)}")
+
+    def _mark_stored(self, draft: DraftRecord) -> None:
+        with self._cond:
+            self._markers.append(_marker("stored", draft))
+
+    def _store(self, drafts: Dict[DraftKey, DraftRecord]) -> None:
+        backend = self._backend()
+        for key, draft in drafts.items():
+            try:
+                # The write may be deferred; it is marked once it lands
+                backend.save_draft(draft, lambda draft=draft: self._mark_stored(draft))
+            except Exception as e:
+                print(f"Error saving draft for {draft.email}: {str(e)}")
+                continue
+            with self._cond:
+                # Keep it if a newer draft arrived meanwhile
+                if self._unstored.get(key) is draft:
+                    del self._unstored[key]
+
+    def _compact(self) -> None:
+        """
+        Rewrite the journal once it is large, keeping only drafts not yet
+        stored. Only done after the backend's deferred writes have landed.
+        """
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except OSError:
+            return
+        if not self._backend().flush(self.flush_seconds):
+            return
+        with self._cond:
+            # Drafts still waiting to be journaled are appended later
+            drafts = list(self._unstored.values())
+        try:
+            self._rewrite(drafts)
+        except OSError as e:
+            print(f"Error compacting draft journal: {str(e)}")
+
+
+_journal: Optional[DraftJournal] = None
+_journal_lock = threading.Lock()
+
+
+def get_draft_journal() -> DraftJournal:
+    """Return the process-wide journal, replaying it on first use."""
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = DraftJournal(DRAFT_JOURNAL_PATH)
+                atexit.register(_journal.close, 30)
+    return _journal
@@ -0,0 +1,130 @@
+"""
+Compressed, deduplicated encoding of playground log objects.
+
+Log records are gzip-compressed JSON and compacted histories gzip-compressed
+JSON lines. Prompt and response bodies of at least min_bytes are moved out of
+the record into content-addressed blobs, named by the SHA-256 of the text and
+stored once however often a prompt is pasted; the record keeps the digest in
+prompt_sha256/response_sha256. Readers also accept the older plain JSON
+records and CSV histories, so both layouts can coexist during migration.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from .records import nan_to_none
+
+BODY_FIELDS = ("prompt", "response")
+COMPRESSED_SUFFIX = ".gz"
+
+
+def digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def compress(data: bytes) -> bytes:
+    # A fixed mtime keeps the bytes, and so the ETag, stable for equal input
+    return gzip.compress(data, mtime=0)
+
+
+def decompress(data: bytes) -> bytes:
+    return gzip.decompress(data)
+
+
+def encode_record(
+    record: Dict[str, Any], min_bytes: int
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Split a record into its stored form and the blobs it refers to.
+    Returns (stored record, {digest: text}).
+    """
+    stored = {
+        key: value for key, value in record.items() if nan_to_none(value) is not None
+    }
+    blobs = {}
+    for field in BODY_FIELDS:
+        text = stored.get(field)
+        if isinstance(text, str) and len(text.encode()) >= min_bytes:
+            ref = digest(text)
+            blobs[ref] = text
+            stored[f"{field}_sha256"] = ref
+            del stored[field]
+    return stored, blobs
+
+
+def encode_log_record(stored: Dict[str, Any]) -> bytes:
+    return compress(json.dumps(stored).encode())
+
+
+def encode_history(stored: Iterable[Dict[str, Any]]) -> bytes:
+    return compress("".join(json.dumps(record) + "\n" for record in stored).encode())
+
+
+def decode_object(key: str, body: bytes) -> list[Dict[str, Any]]:
+    """Decode any playground object, old or new, into its stored records."""
+    if key.endswith(COMPRESSED_SUFFIX):
+        body = decompress(body)
+        key = key[: -len(COMPRESSED_SUFFIX)]
+    if key.endswith(".json"):
+        return [json.loads(body)]
+    if key.endswith(".jsonl"):
+        return [json.loads(line) for line in body.splitlines() if line]
+    return pd.read_csv(io.BytesIO(body)).to_dict("records")
+
+
+def blob_refs(records: Iterable[Dict[str, Any]]) -> set[str]:
+    """Digests of every blob the records refer to."""
+    return {
+        record[f"{field}_sha256"]
+        for record in records
+        for field in BODY_FIELDS
+        if record.get(f"{field}_sha256")
+    }
+
+
+def inline_bodies(
+    records: Iterable[Dict[str, Any]], texts: Dict[str, Optional[str]]
+) -> list[Dict[str, Any]]:
+    """Replace blob references with the texts they name."""
+    resolved = []
+    for record in records:
+        record = dict(record)
+        for field in BODY_FIELDS:
+            ref = record.pop(f"{field}_sha256", None)
+            if ref:
+                record[field] = texts.get(ref)
+        resolved.append(record)
+    return resolved
+
+
+class BlobCache:
+    """
+    In-memory LRU of blob texts by digest. Blobs never change once written,
+    so entries are only evicted for space.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._texts: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ref: str) -> Optional[str]:
+        with self._lock:
+            text = self._texts.get(ref)
+            if text is not None:
+                self._texts.move_to_end(ref)
+            return text
+
+    def set(self, ref: str, text: str) -> None:
+        with self._lock:
+            self._texts[ref] = text
+            self._texts.move_to_end(ref)
+            while len(self._texts) > self.max_entries:
+                self._texts.popitem(last=False)
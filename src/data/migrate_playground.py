@@ -0,0 +1,96 @@
+"""
+Move existing playground/ objects to the compressed, deduplicated layout.
+
+    python -m src.data.migrate_playground [--email EMAIL ...] [--dry-run]
+
+Each user's legacy interactions CSV and plain JSON log records are folded,
+with any newer log records, into one gzip-compressed history, and long
+prompts and responses become shared blobs under PLAYGROUND_BLOB_PREFIX.
+Re-running is safe: users already on the new layout are skipped, and a user
+interrupted mid-migration leaves duplicate records that readers drop.
+"""
+
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from ..config import PLAYGROUND_BLOB_PREFIX, PLAYGROUND_PREFIX
+from .backends import get_backend
+from .backends.s3 import S3Backend
+
+
+def run(
+    emails: Optional[list[str]] = None, dry_run: bool = False, workers: int = 8
+) -> Dict[str, int]:
+    """Migrate every user with legacy objects, or only the given ones."""
+    backend = get_backend()
+    if not isinstance(backend, S3Backend):
+        raise SystemExit("Only the S3 backend stores playground objects")
+
+    # email -> [objects, bytes]
+    legacy = defaultdict(lambda: [0, 0])
+    for email, obj in backend.iter_legacy_playground_objects():
+        if not emails or email in emails:
+            legacy[email][0] += 1
+            legacy[email][1] += obj.get("Size", 0)
+
+    counts = {
+        "users": len(legacy),
+        "legacy_objects": sum(n for n, _ in legacy.values()),
+        "legacy_bytes": sum(size for _, size in legacy.values()),
+        "folded_objects": 0,
+    }
+    if dry_run or not legacy:
+        return counts
+
+    def migrate(email: str) -> int:
+        try:
+            return backend.compact_playground_interactions(email)
+        except Exception as e:
+            print(f"Error migrating playground objects for {email}: {str(e)}")
+            return 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        counts["folded_objects"] = sum(pool.map(migrate, sorted(legacy)))
+
+    counts["playground_bytes"] = backend.stored_bytes(PLAYGROUND_PREFIX)
+    counts["blob_bytes"] = backend.stored_bytes(PLAYGROUND_BLOB_PREFIX)
+    return counts
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--email",
+        action="append",
+        help="migrate only this user (repeatable; default: everyone)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="report what would be migrated without writing anything",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8, help="users migrated concurrently"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    counts = run(args.email, args.dry_run, args.workers)
+    print(
+        f"{counts['users']} users with {counts['legacy_objects']} legacy objects "
+        f"({counts['legacy_bytes']} bytes)"
+    )
+    if "playground_bytes" in counts:
+        print(
+            f"Folded {counts['folded_objects']} objects; playground/ now holds "
+            f"{counts['playground_bytes']} bytes plus {counts['blob_bytes']} "
+            "bytes of shared blobs"
+        )
+
+
+if __name__ == "__main__":
+    main()
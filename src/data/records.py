@@ -0,0 +1,78 @@
+import math
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+
+def nan_to_none(value: Any) -> Any:
+    """Return value, or None if it is a NaN read back from a CSV history."""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class AnswerRecord:
+    """One submitted answer; the unit the interactive path works with."""
+
+    email: str
+    question_number: int
+    answer: str
+    submitted_at: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AnswerRecord":
+        return cls(
+            email=data["email"],
+            question_number=int(data["question_number"]),
+            answer=str(data["answer"]),
+            submitted_at=str(data["submitted_at"]),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class DraftRecord:
+    """The latest unsubmitted text of one answer."""
+
+    email: str
+    question_number: int
+    text: str
+    updated_at: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DraftRecord":
+        return cls(
+            email=data["email"],
+            question_number=int(data["question_number"]),
+            text=str(data["text"]),
+            updated_at=str(data["updated_at"]),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class InteractionRecord:
+    """One playground call, with parameters kept as their JSON encoding."""
+
+    email: str
+    question_number: int
+    prompt: str
+    parameters: str
+    response: str
+    timestamp: str
+    interaction_id: str
+    # Call telemetry; None for records saved before it was captured
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    latency_ms: Optional[float] = None
+    first_token_ms: Optional[float] = None
+    finish_reason: Optional[str] = None
+    system_fingerprint: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
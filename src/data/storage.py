@@ -1,152 +1,142 @@
+import atexit
 from datetime import datetime
-from io import StringIO
 import pandas as pd
 import json
-from typing import Dict, Any
-from ..config import (
-    S3_BUCKET,
-    AWS_ACCESS_KEY_ID,
-    AWS_SECRET_ACCESS_KEY,
-    ANSWERS_PREFIX,
-    PLAYGROUND_PREFIX,
-)
-import boto3
-import io
-
-s3_client = boto3.client(
-    "s3",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-)
+import uuid
+from typing import Dict, Any, Iterator, Optional
+from .backends import get_backend
+from .drafts import get_draft_journal
+from .records import AnswerRecord, DraftRecord, InteractionRecord
+from .usage import UsageAggregates, UsageTracker
+from ..tracing import traced
 
+# Per-process playground usage aggregates, kept current by every save
+_usage = UsageTracker()
 
+
+@traced("storage.save_answer")
 def save_answer(email: str, question_number: int, answer: str) -> None:
-    """Save or update a user's answer to a question."""
-    new_answer = pd.DataFrame(
-        {
-            "email": [email],
-            "question_number": [question_number],
-            "answer": [answer],
-            "submitted_at": [datetime.now().isoformat()],
-        }
-    )
+    """
+    Save or update a user's answer to a question, and delete the question's
+    stored draft, which the answer supersedes.
+    Raises if this or an earlier answer of the user could not be stored.
+    """
+    backend = get_backend()
+    submitted_at = datetime.now().isoformat()
+    backend.save_answer(email, question_number, answer, submitted_at)
+    backend.delete_draft(email, question_number, submitted_at)
 
-    try:
-        # Try to get existing answers
-        response = s3_client.get_object(
-            Bucket=S3_BUCKET, Key=f"{ANSWERS_PREFIX}{email}_answers.csv"
-        )
-        df = pd.read_csv(io.BytesIO(response["Body"].read()))
-
-        # Update existing answer or append new one
-        mask = (df["email"] == email) & (df["question_number"] == question_number)
-        if mask.any():
-            for col in df.columns:
-                df.loc[mask, col] = new_answer[col].iloc[0]
-        else:
-            df = pd.concat([df, new_answer], ignore_index=True)
-    except:
-        # If file doesn't exist, use the new answer DataFrame
-        df = new_answer
-
-    # Save to S3
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
-    s3_client.put_object(
-        Bucket=S3_BUCKET,
-        Key=f"{ANSWERS_PREFIX}{email}_answers.csv",
-        Body=csv_buffer.getvalue(),
-    )
 
+@traced("storage.get_answers")
+def get_answers(email: str) -> Dict[int, AnswerRecord]:
+    """Retrieve a user's answers keyed by question number."""
+    return get_backend().get_answer_index(email)
+
+
+def get_answer_save_error(email: str) -> Optional[str]:
+    """
+    Why some of the user's answers are not stored yet, if they are not; they
+    stay in get_answers and their writes keep being retried.
+    """
+    error = get_backend().answer_save_error(email)
+    return str(error) if error is not None else None
+
+
+def iter_answers(question_number: Optional[int] = None) -> Iterator[AnswerRecord]:
+    """
+    Stream every student's answers, optionally to one question only.
+    Records are read in bounded batches, so memory stays flat however many
+    students there are.
+    """
+    for record in get_backend().iter_answers(question_number=question_number):
+        yield AnswerRecord.from_dict(record)
 
-def get_user_answers(email: str) -> pd.DataFrame:
-    """Retrieve all answers for a specific user."""
-    try:
-        response = s3_client.get_object(
-            Bucket=S3_BUCKET, Key=f"{ANSWERS_PREFIX}{email}_answers.csv"
-        )
-        return pd.read_csv(io.BytesIO(response["Body"].read()))
-    except:
-        return pd.DataFrame(
-            columns=["email", "question_number", "answer", "submitted_at"]
-        )
 
+@traced("storage.save_draft")
+def save_draft(email: str, question_number: int, text: str) -> DraftRecord:
+    """Record an unsubmitted answer; it is persisted in the background."""
+    return get_draft_journal().record(email, question_number, text)
 
-def get_last_answered_question(email: str) -> int:
-    """Get the last question number answered by the user."""
-    df = get_user_answers(email)
-    if df.empty:
-        return -1
-    return df["question_number"].max()
 
+def flush_drafts(email: str, submitted: Optional[int] = None) -> None:
+    """
+    Send the user's pending drafts to storage now, without waiting.
+    submitted is the question just answered, whose draft is no longer needed.
+    """
+    get_draft_journal().request_flush(email, submitted)
 
+
+@traced("storage.get_drafts")
+def get_drafts(email: str) -> Dict[int, DraftRecord]:
+    """A user's latest drafts keyed by question number, stored or journaled."""
+    drafts = get_backend().get_drafts(email)
+    for question_number, draft in get_draft_journal().unstored(email).items():
+        known = drafts.get(question_number)
+        if known is None or known.updated_at < draft.updated_at:
+            drafts[question_number] = draft
+    return drafts
+
+
+def flush_writes(timeout: Optional[float] = None) -> bool:
+    """Wait for queued background writes to be stored."""
+    return get_backend().flush(timeout)
+
+
+# Registered before the draft journal is built, so it runs after the
+# journal's close has handed over its last drafts
+atexit.register(flush_writes, 30)
+
+
+@traced("storage.save_playground_interaction")
 def save_playground_interaction(
     email: str,
     question_number: int,
     prompt: str,
     parameters: Dict[Any, Any],
     response: str,
+    telemetry: Optional[Dict[str, Any]] = None,
 ) -> None:
-    """Save a playground interaction."""
-    new_interaction = pd.DataFrame(
-        [
-            {
-                "email": email,
-                "question_number": question_number,
-                "prompt": prompt,
-                "parameters": json.dumps(parameters),
-                "response": response,
-                "timestamp": datetime.now().isoformat(),
-            }
-        ]
+    """
+    Save a playground interaction.
+    telemetry holds the call's token usage, latency, finish reason and model
+    fingerprint, as reported by the AI response.
+    """
+    record = InteractionRecord(
+        email=email,
+        question_number=question_number,
+        prompt=prompt,
+        parameters=json.dumps(parameters),
+        response=response,
+        timestamp=datetime.now().isoformat(),
+        interaction_id=uuid.uuid4().hex,
+        **(telemetry or {}),
     )
-
-    try:
-        # Try to get existing interactions
-        response = s3_client.get_object(
-            Bucket=S3_BUCKET, Key=f"{PLAYGROUND_PREFIX}{email}_interactions.csv"
-        )
-        interactions = pd.read_csv(io.BytesIO(response["Body"].read()))
-        interactions = pd.concat([interactions, new_interaction], ignore_index=True)
-    except:
-        # If file doesn't exist, use the new interaction DataFrame
-        interactions = new_interaction
-
-    # Save to S3
-    csv_buffer = StringIO()
-    interactions.to_csv(csv_buffer, index=False)
-    s3_client.put_object(
-        Bucket=S3_BUCKET,
-        Key=f"{PLAYGROUND_PREFIX}{email}_interactions.csv",
-        Body=csv_buffer.getvalue(),
+    get_backend().save_playground_interaction(record)
+    _usage.record(record.to_dict())
+
+
+@traced("storage.get_playground_usage")
+def get_playground_usage(email: Optional[str] = None) -> UsageAggregates:
+    """
+    Playground usage per question and per model for one user, or everyone.
+    Built from the log on first use, then updated by each save; only the
+    recent interactions it shows have their bodies fetched.
+    """
+    backend = get_backend()
+    return _usage.get(
+        email,
+        lambda: backend.iter_playground_interactions(email=email, bodies=False),
+        backend.resolve_bodies,
     )
 
 
+@traced("storage.get_playground_interactions")
 def get_playground_interactions(email: str = None) -> pd.DataFrame:
     """Retrieve playground interactions, optionally filtered by email."""
     try:
-        if email:
-            # Get interactions for specific user
-            response = s3_client.get_object(
-                Bucket=S3_BUCKET, Key=f"{PLAYGROUND_PREFIX}{email}_interactions.csv"
-            )
-            df = pd.read_csv(io.BytesIO(response["Body"].read()))
-        else:
-            # Get all interactions (admin mode)
-            # List all interaction files
-            response = s3_client.list_objects_v2(
-                Bucket=S3_BUCKET, Prefix=PLAYGROUND_PREFIX
-            )
-            all_interactions = []
-            for obj in response.get("Contents", []):
-                file_response = s3_client.get_object(Bucket=S3_BUCKET, Key=obj["Key"])
-                df = pd.read_csv(io.BytesIO(file_response["Body"].read()))
-                all_interactions.append(df)
-
-            if not all_interactions:
-                return pd.DataFrame()
-
-            df = pd.concat(all_interactions, ignore_index=True)
+        df = get_backend().get_playground_interactions(email)
+        if df.empty:
+            return df
 
         # Convert JSON string back to dict and normalize
         df["parameters"] = df["parameters"].apply(json.loads)
@@ -0,0 +1,254 @@
+import json
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from ..config import MODEL_PRICES, USAGE_CACHE_ENTRIES
+from .records import nan_to_none
+
+# Latency histogram bucket upper bounds in ms, 25 ms doubling up to ~7 minutes
+LATENCY_BUCKETS_MS = tuple(25 * 2**i for i in range(15))
+RECENT_INTERACTIONS = 5
+
+# Fills in prompts and responses that records left as references
+Resolver = Callable[[list[Dict[str, Any]]], list[Dict[str, Any]]]
+
+
+def _number(value: Any) -> Optional[float]:
+    value = nan_to_none(value)
+    return None if value is None else float(value)
+
+
+def _model(record: Dict[str, Any]) -> Optional[str]:
+    parameters = record.get("parameters")
+    if isinstance(parameters, str):
+        try:
+            parameters = json.loads(parameters)
+        except ValueError:
+            return None
+    return parameters.get("model") if isinstance(parameters, dict) else None
+
+
+class UsageStats:
+    """Running totals for one question, one model, or everything."""
+
+    __slots__ = ("calls", "prompt_tokens", "completion_tokens", "spend", "_latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.spend = 0.0
+        # One count per bucket in LATENCY_BUCKETS_MS, plus one for overflow
+        self._latency = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(
+        self,
+        prompt_tokens: int,
+        completion_tokens: int,
+        spend: float,
+        latency_ms: Optional[float],
+    ) -> None:
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.spend += spend
+        if latency_ms is not None:
+            bucket = next(
+                (
+                    i
+                    for i, bound in enumerate(LATENCY_BUCKETS_MS)
+                    if latency_ms <= bound
+                ),
+                len(LATENCY_BUCKETS_MS),
+            )
+            self._latency[bucket] += 1
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        """Upper bound of the histogram bucket holding the pct-th latency."""
+        timed = sum(self._latency)
+        if not timed:
+            return None
+        rank = max(1, math.ceil(pct / 100 * timed))
+        seen = 0
+        for bucket, count in enumerate(self._latency):
+            seen += count
+            if seen >= rank:
+                break
+        return float(LATENCY_BUCKETS_MS[min(bucket, len(LATENCY_BUCKETS_MS) - 1)])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "p95_latency_ms": self.latency_percentile(95),
+            "spend_usd": round(self.spend, 6),
+        }
+
+
+class UsageAggregates:
+    """
+    Playground usage per question_number and per model, updated one
+    interaction at a time so reading it never scans the history. Records
+    may leave long prompts and responses as references; resolve fills them
+    in for the few recent interactions that are shown.
+    """
+
+    def __init__(
+        self,
+        resolve: Optional[Resolver] = None,
+    ):
+        self.total = UsageStats()
+        self.by_question: Dict[int, UsageStats] = {}
+        self.by_model: Dict[str, UsageStats] = {}
+        self._recent: list[Dict[str, Any]] = []
+        self._resolve = resolve
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Fold in one raw interaction record."""
+        model = _model(record) or "unknown"
+        prompt_tokens = int(_number(record.get("prompt_tokens")) or 0)
+        completion_tokens = int(_number(record.get("completion_tokens")) or 0)
+        prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        spend = (
+            prompt_tokens * prompt_price + completion_tokens * completion_price
+        ) / 1_000_000
+        values = (
+            prompt_tokens,
+            completion_tokens,
+            spend,
+            _number(record.get("latency_ms")),
+        )
+
+        with self._lock:
+            self.total.add(*values)
+            question = int(record["question_number"])
+            self.by_question.setdefault(question, UsageStats()).add(*values)
+            self.by_model.setdefault(model, UsageStats()).add(*values)
+
+            self._recent.append(record)
+            self._recent.sort(key=lambda r: r["timestamp"], reverse=True)
+            del self._recent[RECENT_INTERACTIONS:]
+
+    def rows(self, dimension: str) -> list[Dict[str, Any]]:
+        """One summary row per question_number or per model."""
+        with self._lock:
+            groups = (
+                self.by_question if dimension == "question_number" else self.by_model
+            )
+            return [
+                {dimension: key, **stats.to_dict()}
+                for key, stats in sorted(groups.items())
+            ]
+
+    def recent(self) -> list[Dict[str, Any]]:
+        """The newest interactions, newest first."""
+        with self._lock:
+            records = list(self._recent)
+        if self._resolve is not None:
+            records = self._resolve(records)
+        return [
+            {
+                "timestamp": record["timestamp"],
+                "question_number": int(record["question_number"]),
+                "model": _model(record) or "unknown",
+                "prompt": record.get("prompt"),
+                "response": record.get("response"),
+            }
+            for record in records
+        ]
+
+
+class UsageTracker:
+    """
+    Aggregates for each user and for everyone (key None), built from the log
+    the first time they are requested and then kept current by every save in
+    this process. Only the max_entries most recently used users are kept;
+    an evicted user's aggregates are rebuilt from the log when next needed.
+    """
+
+    def __init__(self, max_entries: int = USAGE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._aggregates: OrderedDict[Optional[str], UsageAggregates] = OrderedDict()
+        # Saves that arrive while a key's aggregates are being built, and an
+        # event set when that build ends
+        self._pending: Dict[Optional[str], list[Dict[str, Any]]] = {}
+        self._building: Dict[Optional[str], threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def record(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            for key in (record["email"], None):
+                if key in self._aggregates:
+                    self._aggregates[key].add(record)
+                elif key in self._pending:
+                    self._pending[key].append(record)
+
+    def get(
+        self,
+        key: Optional[str],
+        load: Callable[[], Iterable[Dict[str, Any]]],
+        resolve: Optional[Resolver] = None,
+    ) -> UsageAggregates:
+        """
+        The key's aggregates, built from load() if they are not in memory.
+        resolve is handed to new aggregates; see UsageAggregates.
+        """
+        while True:
+            with self._lock:
+                if key in self._aggregates:
+                    self._aggregates.move_to_end(key)
+                    return self._aggregates[key]
+                building = self._building.get(key)
+                if building is None:
+                    done = self._building[key] = threading.Event()
+                    self._pending[key] = []
+                    break
+            # Another request is loading this key; use its result, or retry
+            # if it failed
+            building.wait()
+
+        aggregates = UsageAggregates(resolve)
+        loaded = set()
+        try:
+            for record in load():
+                aggregates.add(record)
+                loaded.add(record.get("interaction_id"))
+        except BaseException:
+            with self._lock:
+                del self._pending[key]
+                del self._building[key]
+            done.set()
+            raise
+
+        with self._lock:
+            for record in self._pending.pop(key):
+                if record["interaction_id"] not in loaded:
+                    aggregates.add(record)
+            self._aggregates[key] = aggregates
+            del self._building[key]
+            self._evict()
+        done.set()
+        return aggregates
+
+    def _evict(self) -> None:
+        """Drop least recently used users; everyone's aggregates are kept."""
+        users = len(self._aggregates) - (None in self._aggregates)
+        for key in list(self._aggregates):
+            if users <= self.max_entries:
+                break
+            if key is not None:
+                del self._aggregates[key]
+                users -= 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._aggregates.clear()
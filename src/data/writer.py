@@ -0,0 +1,192 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+
+class _WriteJob:
+    __slots__ = ("key", "body", "on_success", "write", "keep")
+
+    def __init__(
+        self,
+        key: str,
+        body: bytes,
+        on_success: Optional[Callable[[str], None]],
+        write: Optional[Callable[[str, bytes], Optional[str]]],
+        keep: bool,
+    ):
+        self.key = key
+        self.body = body
+        self.on_success = on_success
+        self.write = write
+        self.keep = keep
+
+
+class BackgroundWriter:
+    """
+    Queue that performs object writes off the request thread.
+
+    Writes to the same key run one at a time in submission order, and a write
+    submitted while an earlier one for that key is still queued replaces it, so
+    a burst of saves costs one PUT. Failed writes are retried with jittered
+    exponential backoff. A kept job that still fails is parked and tried
+    again every retry_seconds until it succeeds, with its last error in
+    failed. Bodies stay visible through pending() until written, which lets
+    readers see their own writes.
+    """
+
+    def __init__(
+        self,
+        put: Callable[[str, bytes], Optional[str]],
+        workers: int = 4,
+        max_attempts: int = 5,
+        backoff_base: float = 0.2,
+        retry_seconds: float = 10.0,
+    ):
+        self._put = put
+        self._max_attempts = max_attempts
+        self._backoff_base = backoff_base
+        self._retry_seconds = retry_seconds
+        self._queued: Dict[str, _WriteJob] = {}
+        self._inflight: Dict[str, _WriteJob] = {}
+        self._ready: deque[str] = deque()
+        # Queued keys whose last write failed, waiting for their next retry
+        self._parked: set[str] = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.failed: Dict[str, Exception] = {}
+        self._threads = [
+            threading.Thread(target=self._run, name=f"s3-writer-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        key: str,
+        body: bytes,
+        on_success: Optional[Callable[[str], None]] = None,
+        write: Optional[Callable[[str, bytes], Optional[str]]] = None,
+        keep: bool = False,
+    ) -> None:
+        """
+        Queue a write of body to key; on_success receives the new ETag.
+        write replaces the plain PUT for this job, e.g. with a conditional
+        read-merge-write, and must be safe to retry. With keep, the job is
+        never given up on, so data that exists nowhere else is not lost.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BackgroundWriter is shut down")
+            already_queued = key in self._queued and key not in self._parked
+            self._queued[key] = _WriteJob(key, body, on_success, write, keep)
+            # A new body for a parked key is tried right away
+            self._parked.discard(key)
+            if not already_queued and key not in self._inflight:
+                self._ready.append(key)
+                self._cond.notify()
+
+    def pending(self, key: str) -> Optional[bytes]:
+        """Return the newest body not yet written for key, if any."""
+        with self._cond:
+            job = self._queued.get(key) or self._inflight.get(key)
+            return job.body if job is not None else None
+
+    def pending_under(self, prefix: str) -> Dict[str, bytes]:
+        """Return every unwritten body whose key starts with prefix."""
+        with self._cond:
+            jobs = {**self._inflight, **self._queued}
+            return {
+                key: job.body for key, job in jobs.items() if key.startswith(prefix)
+            }
+
+    def failed_under(self, prefix: str) -> Dict[str, Exception]:
+        """Return the last error of every parked write whose key starts with prefix."""
+        with self._cond:
+            return {
+                key: error
+                for key, error in self.failed.items()
+                if key.startswith(prefix)
+            }
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued write has finished. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queued or self._inflight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Flush outstanding writes and stop accepting new ones."""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        return flushed
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._ready and not self._closed:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+                key = self._ready.popleft()
+                job = self._queued.pop(key)
+                self._inflight[key] = job
+
+            written = self._write(job)
+
+            with self._cond:
+                del self._inflight[key]
+                # A newer body arrived while this one was in flight
+                if key in self._queued:
+                    self._ready.append(key)
+                elif not written and job.keep:
+                    self._queued[key] = job
+                    self._park(key)
+                self._cond.notify_all()
+
+    def _park(self, key: str) -> None:
+        self._parked.add(key)
+        timer = threading.Timer(self._retry_seconds, self._unpark, (key,))
+        timer.daemon = True
+        timer.start()
+
+    def _unpark(self, key: str) -> None:
+        with self._cond:
+            if key in self._parked:
+                self._parked.discard(key)
+                self._ready.append(key)
+                self._cond.notify_all()
+
+    def _write(self, job: _WriteJob) -> bool:
+        """Write a job, retrying with backoff; returns False if every attempt failed."""
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                etag = (job.write or self._put)(job.key, job.body)
+            except Exception as e:
+                if attempt == self._max_attempts:
+                    print(f"Error writing {job.key}: {str(e)}")
+                    if job.keep:
+                        with self._cond:
+                            self.failed[job.key] = e
+                    return False
+                delay = self._backoff_base * 2 ** (attempt - 1)
+                time.sleep(random.uniform(0, delay))
+                continue
+
+            with self._cond:
+                self.failed.pop(job.key, None)
+            if job.on_success is not None:
+                try:
+                    job.on_success(etag)
+                except Exception as e:
+                    print(f"Error in write callback for {job.key}: {str(e)}")
+            return True
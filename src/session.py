@@ -0,0 +1,111 @@
+"""
+Login bootstrap: everything a returning student's first screen needs, fetched
+concurrently so resuming costs one parallel round trip instead of several
+sequential ones.
+"""
+
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+from .catalog import CATALOG
+from .config import BOOTSTRAP_WORKERS
+from .data.records import AnswerRecord, DraftRecord
+from .data.storage import get_answers, get_drafts, get_playground_usage
+from .tracing import traced
+from .ui.components import load_image
+
+_pool = ThreadPoolExecutor(
+    max_workers=BOOTSTRAP_WORKERS, thread_name_prefix="session-bootstrap"
+)
+
+
+@dataclass(frozen=True, slots=True)
+class SessionData:
+    answers: Dict[int, AnswerRecord]
+    # Only drafts newer than the submitted answer to their question
+    drafts: Dict[int, DraftRecord]
+    last_answered: int
+    resume_question: int
+
+
+def _submit(fn: Callable, *args) -> Future:
+    # Each task gets its own copy of the caller's context, so its spans are
+    # recorded under the login rerun
+    return _pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _result_or(future: Future, default, what: str):
+    """The future's result, or the default if the fetch failed."""
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Error loading {what}: {str(e)}")
+        return default
+
+
+def _warm_usage(email: str) -> None:
+    """Build the user's playground usage so the sidebar finds it ready."""
+    try:
+        get_playground_usage(email)
+    except Exception as e:
+        # The sidebar reports the error if it happens again there
+        print(f"Error loading playground usage: {str(e)}")
+
+
+def _prefetch_images(question_number: int) -> None:
+    """Warm the image cache for a question and the one after it."""
+    for question in CATALOG[question_number : question_number + 2]:
+        if question.image_path:
+            try:
+                load_image(question.image_path)
+            except Exception as e:
+                # display_question reports the error when it renders
+                print(f"Error prefetching image {question.image_path}: {str(e)}")
+
+
+def _start_prefetch(question_number: int) -> threading.Thread:
+    # st.cache_resource expects the session's script context on the thread,
+    # which Streamlit only supports attaching before the thread starts, so
+    # this runs on its own thread rather than on the pool
+    thread = threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(_prefetch_images, question_number),
+        name="image-prefetch",
+        daemon=True,
+    )
+    add_script_run_ctx(thread)
+    thread.start()
+    return thread
+
+
+@traced("session.bootstrap")
+def load_session(email: str) -> SessionData:
+    """
+    Fetch a user's answers and drafts concurrently, and warm the images of
+    the question they resume on and the next one. Only a failure to read
+    the answers fails the login; missing drafts are left empty. Playground
+    usage is built in the background, as only the sidebar history needs it.
+    """
+    answers_future = _submit(get_answers, email)
+    drafts_future = _submit(get_drafts, email)
+    _submit(_warm_usage, email)
+
+    answers = answers_future.result()
+    last_answered = max(answers, default=-1)
+    resume_question = min(last_answered + 1, len(CATALOG) - 1)
+    # Images are local, so this usually finishes before the drafts arrive
+    prefetch = _start_prefetch(resume_question)
+
+    drafts = {
+        question_number: draft
+        for question_number, draft in _result_or(drafts_future, {}, "drafts").items()
+        if question_number not in answers
+        or draft.updated_at > answers[question_number].submitted_at
+    }
+    prefetch.join()
+    return SessionData(answers, drafts, last_answered, resume_question)
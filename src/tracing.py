@@ -0,0 +1,264 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .config import TRACING_ENABLED, TRACE_EXPORT_PATH, TRACE_EXPORT_FORMAT
+
+
+class Span:
+    """One timed operation, e.g. an S3 GET or an OpenAI call."""
+
+    __slots__ = (
+        "name",
+        "started_at",
+        "_start",
+        "duration_ms",
+        "status",
+        "key",
+        "bytes",
+        "rerun_id",
+        "user",
+    )
+
+    def __init__(self, name: str, key: Optional[str] = None, bytes: int = 0):
+        self.name = name
+        self.key = key
+        self.bytes = bytes
+        self.status = "ok"
+        self.duration_ms = 0.0
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        rerun = _current_rerun.get()
+        self.rerun_id = rerun.id if rerun is not None else None
+        self.user = rerun.user if rerun is not None else None
+
+    def set(self, key: Optional[str] = None, bytes: Optional[int] = None) -> None:
+        if key is not None:
+            self.key = key
+        if bytes is not None:
+            self.bytes = bytes
+
+    def end(self, status: Optional[str] = None) -> None:
+        if status is not None:
+            self.status = status
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        _record(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "key": self.key,
+            "bytes": self.bytes,
+            "rerun_id": self.rerun_id,
+            "user": self.user,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, key=None, bytes=None) -> None:
+        pass
+
+    def end(self, status=None) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Rerun:
+    """All spans recorded during one Streamlit script run."""
+
+    __slots__ = ("id", "user", "started_at", "duration_ms", "spans")
+
+    def __init__(self, user: Optional[str]):
+        self.id = uuid.uuid4().hex[:12]
+        self.user = user
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.spans: list[Span] = []
+
+
+_current_rerun: contextvars.ContextVar[Optional[Rerun]] = contextvars.ContextVar(
+    "current_rerun", default=None
+)
+_lock = threading.Lock()
+_recent_reruns: deque[Rerun] = deque(maxlen=100)
+# Spans recorded outside a rerun, e.g. on the background writer
+_unattached: list[Span] = []
+# name -> [count, errors, total seconds, total bytes]
+_totals: Dict[str, list] = {}
+
+
+def enabled() -> bool:
+    return TRACING_ENABLED
+
+
+def _record(span: Span) -> None:
+    rerun = _current_rerun.get()
+    with _lock:
+        totals = _totals.setdefault(span.name, [0, 0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += span.status != "ok"
+        totals[2] += span.duration_ms / 1000
+        totals[3] += span.bytes or 0
+        if rerun is not None and rerun.id == span.rerun_id:
+            rerun.spans.append(span)
+        else:
+            _unattached.append(span)
+
+
+def start_span(name: str, key: Optional[str] = None, bytes: int = 0):
+    """Start a span that the caller finishes with span.end()."""
+    if not TRACING_ENABLED:
+        return _NOOP_SPAN
+    return Span(name, key=key, bytes=bytes)
+
+
+@contextmanager
+def _span(name: str, key: Optional[str], bytes: int) -> Iterator[Span]:
+    span = Span(name, key=key, bytes=bytes)
+    try:
+        yield span
+    except Exception as e:
+        # Keep a more specific status set inside the block, e.g. an S3 code
+        if span.status == "ok":
+            span.status = type(e).__name__
+        raise
+    finally:
+        span.end()
+
+
+def span(name: str, key: Optional[str] = None, bytes: int = 0):
+    """Time the enclosed block as a span."""
+    if not TRACING_ENABLED:
+        return _NOOP_SPAN
+    return _span(name, key, bytes)
+
+
+def traced(name: str) -> Callable:
+    """Decorate a function so every call is recorded as a span."""
+
+    def decorator(fn: Callable) -> Callable:
+        # Tracing is fixed at startup, so untraced functions are left untouched
+        if not TRACING_ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _span(name, None, 0):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def rerun(user: Optional[str]) -> Iterator[Optional[Rerun]]:
+    """Group every span recorded inside the block under one rerun."""
+    if not TRACING_ENABLED:
+        yield None
+        return
+
+    current = Rerun(user)
+    token = _current_rerun.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration_ms = (time.perf_counter() - start) * 1000
+        _current_rerun.reset(token)
+        with _lock:
+            _recent_reruns.append(current)
+            unattached = list(_unattached)
+            _unattached.clear()
+        _export(current, unattached)
+
+
+def recent_reruns(user: Optional[str] = None) -> list[Rerun]:
+    """Most recent reruns first, optionally only one user's."""
+    with _lock:
+        reruns = list(_recent_reruns)
+    return [r for r in reversed(reruns) if user is None or r.user == user]
+
+
+def totals() -> Dict[str, Dict[str, float]]:
+    with _lock:
+        return {
+            name: {
+                "count": count,
+                "errors": errors,
+                "seconds": seconds,
+                "bytes": total_bytes,
+            }
+            for name, (count, errors, seconds, total_bytes) in _totals.items()
+        }
+
+
+def _export(current: Rerun, unattached: list[Span]) -> None:
+    if not TRACE_EXPORT_PATH:
+        return
+    try:
+        if TRACE_EXPORT_FORMAT == "prometheus":
+            _write_prometheus(TRACE_EXPORT_PATH)
+        else:
+            _append_jsonl(TRACE_EXPORT_PATH, current, unattached)
+    except OSError as e:
+        print(f"Error exporting traces: {str(e)}")
+
+
+def _append_jsonl(path: str, current: Rerun, unattached: list[Span]) -> None:
+    lines = [
+        json.dumps(
+            {
+                "type": "rerun",
+                "rerun_id": current.id,
+                "user": current.user,
+                "started_at": current.started_at,
+                "duration_ms": round(current.duration_ms, 3),
+            }
+        )
+    ]
+    lines.extend(json.dumps(s.to_dict()) for s in current.spans + unattached)
+    with _lock:
+        with open(path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def _write_prometheus(path: str) -> None:
+    lines = [
+        "# TYPE app_span_calls_total counter",
+        "# TYPE app_span_errors_total counter",
+        "# TYPE app_span_seconds_total counter",
+        "# TYPE app_span_bytes_total counter",
+    ]
+    for name, values in sorted(totals().items()):
+        label = f'{{span="{name}"}}'
+        lines.append(f"app_span_calls_total{label} {values['count']}")
+        lines.append(f"app_span_errors_total{label} {values['errors']}")
+        lines.append(f"app_span_seconds_total{label} {values['seconds']:.6f}")
+        lines.append(f"app_span_bytes_total{label} {values['bytes']}")
+
+    # Replace atomically so a scraper never reads a half-written file
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
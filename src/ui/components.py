@@ -1,40 +1,42 @@
+import io
 import streamlit as st
 from typing import Optional
 import pandas as pd
-
-
-def display_question(question: str) -> None:
+from PIL import Image
+from ..catalog import Question
+from ..config import IMAGE_MAX_WIDTH
+from ..data.usage import UsageAggregates
+
+
+@st.cache_resource(show_spinner=False)
+def load_image(path: str, max_width: int = IMAGE_MAX_WIDTH) -> bytes:
+    """
+    Decode an image, downscale it to max_width and re-encode it.
+    Cached per process, so every session is sent the same small file.
+    """
+    with Image.open(path) as image:
+        if image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            image = image.resize((max_width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def display_question(question: Question) -> None:
     """Display a question with proper formatting for text and images."""
-    if "![Image]" in question:
-        parts = question.split("![Image]")
-
-        # Display text part
-        title_end = parts[0].find("\n")
-        task_title = parts[0][:title_end].strip()
-        task_content = parts[0][title_end:].strip()
-
-        st.markdown(
-            f"<h1 style='text-align: center;'>{task_title}</h1>", unsafe_allow_html=True
-        )
-        st.write(task_content)
+    st.markdown(
+        f"<h1 style='text-align: center;'>{question.title}</h1>",
+        unsafe_allow_html=True,
+    )
+    st.write(question.body)
 
-        # Display image
-        image_path = parts[1].strip()[1:-1]
+    if question.image_path:
         try:
-            image_path = image_path.replace("(", "").replace(")", "").strip()
-            st.image(image_path)
+            st.image(load_image(question.image_path))
         except Exception as e:
-            st.error(f"Could not load image: {image_path}")
+            st.error(f"Could not load image: {question.image_path}")
             st.error(f"Error details: {str(e)}")
-    else:
-        title_end = question.find("\n")
-        task_title = question[:title_end].strip()
-        task_content = question[title_end:].strip()
-
-        st.markdown(
-            f"<h1 style='text-align: center;'>{task_title}</h1>", unsafe_allow_html=True
-        )
-        st.write(task_content)
 
 
 def display_navigation(
@@ -82,19 +84,46 @@ def display_answer_history(answers_df: pd.DataFrame, questions: list[str]) -> No
         st.info("You haven't submitted any answers yet.")
 
 
-def display_playground_history(interactions_df: pd.DataFrame) -> None:
-    """Display playground interaction history."""
-    if not interactions_df.empty:
+def display_playground_history(usage: UsageAggregates) -> None:
+    """Display playground usage aggregates and the latest interactions."""
+    if usage.total.calls:
         st.markdown("### Usage Summary")
-        st.write(f"Total interactions: {len(interactions_df)}")
-        st.write("Model usage distribution:")
-        st.write(interactions_df["model"].value_counts())
+        st.write(f"Total interactions: {usage.total.calls}")
+        st.write(f"Total tokens: {usage.total.total_tokens}")
+        st.write(f"Estimated spend: ${usage.total.spend:.4f}")
+        st.write("Usage by model:")
+        st.dataframe(pd.DataFrame(usage.rows("model")))
+        st.write("Usage by question:")
+        st.dataframe(pd.DataFrame(usage.rows("question_number")))
 
         st.markdown("### Recent Interactions")
         st.dataframe(
-            interactions_df[["timestamp", "question_number", "prompt", "response"]]
-            .tail(5)
-            .sort_values("timestamp", ascending=False)
+            pd.DataFrame(usage.recent())[
+                ["timestamp", "question_number", "prompt", "response"]
+            ]
         )
     else:
         st.info("No playground interactions found.")
+
+
+def display_trace_panel(reruns: list, totals: dict) -> None:
+    """Display recent rerun timings and per-span totals for debugging."""
+    with st.expander("Debug: traces"):
+        if not reruns:
+            st.info("No traced reruns yet.")
+            return
+
+        latest = reruns[0]
+        st.write(f"Last rerun: {latest.duration_ms:.0f} ms, {len(latest.spans)} spans")
+        if latest.spans:
+            st.dataframe(
+                pd.DataFrame([span.to_dict() for span in latest.spans])[
+                    ["name", "duration_ms", "status", "key", "bytes"]
+                ]
+            )
+
+        st.write("Recent reruns (ms):")
+        st.bar_chart(pd.Series([r.duration_ms for r in reversed(reruns)]))
+
+        st.write("Totals by span:")
+        st.dataframe(pd.DataFrame.from_dict(totals, orient="index"))
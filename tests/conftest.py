@@ -0,0 +1,4 @@
+import os
+
+# src.config requires an API key; the tests never call the API
+os.environ.setdefault("OPENAI_API_KEY", "test")
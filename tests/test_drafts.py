@@ -0,0 +1,76 @@
+import json
+
+from src.data.backends.sqlite import SQLiteBackend
+from src.data.drafts import DraftJournal
+
+
+def journal(tmp_path, backend, **kwargs):
+    options = {"debounce_seconds": 0.01, "flush_seconds": 60}
+    options.update(kwargs)
+    return DraftJournal(str(tmp_path / "drafts.jsonl"), lambda: backend, **options)
+
+
+def lines(tmp_path):
+    with open(tmp_path / "drafts.jsonl") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_closing_stores_drafts_and_marks_them(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "course.db"))
+    drafts = journal(tmp_path, backend)
+    draft = drafts.record("a@x.com", 0, "first try")
+    drafts.close(5)
+
+    assert backend.get_drafts("a@x.com") == {0: draft}
+    markers = [line for line in lines(tmp_path) if "marker" in line]
+    assert [marker["marker"] for marker in markers] == ["stored"]
+    assert journal(tmp_path, backend).unstored("a@x.com") == {}
+
+
+def test_replay_resends_only_unsettled_drafts(tmp_path):
+    entries = [
+        # Stored, then superseded by a newer draft that never reached storage
+        {"email": "a@x.com", "question_number": 0, "text": "a", "updated_at": "1"},
+        {
+            "marker": "stored",
+            "email": "a@x.com",
+            "question_number": 0,
+            "updated_at": "1",
+        },
+        {"email": "a@x.com", "question_number": 0, "text": "b", "updated_at": "2"},
+        # Dropped by a submit
+        {"email": "a@x.com", "question_number": 1, "text": "c", "updated_at": "1"},
+        {
+            "marker": "dropped",
+            "email": "a@x.com",
+            "question_number": 1,
+            "updated_at": "3",
+        },
+    ]
+    with open(tmp_path / "drafts.jsonl", "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        # A line cut short by a crash
+        f.write('{"email": "a@x.com", "quest')
+
+    backend = SQLiteBackend(str(tmp_path / "course.db"))
+    drafts = journal(tmp_path, backend)
+    unstored = drafts.unstored("a@x.com")
+    assert {q: draft.text for q, draft in unstored.items()} == {0: "b"}
+    # Replay rewrites the journal down to the unsettled drafts
+    assert [line["text"] for line in lines(tmp_path)] == ["b"]
+
+    drafts.close(5)
+    assert {q: d.text for q, d in backend.get_drafts("a@x.com").items()} == {0: "b"}
+
+
+def test_submitting_drops_the_draft(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "course.db"))
+    drafts = journal(tmp_path, backend)
+    drafts.record("a@x.com", 0, "answered")
+    drafts.record("a@x.com", 1, "still typing")
+    drafts.request_flush("a@x.com", submitted=0)
+    drafts.close(5)
+
+    assert sorted(backend.get_drafts("a@x.com")) == [1]
+    assert journal(tmp_path, backend).unstored("a@x.com") == {}
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from benchmarks.stubs import LocalS3
+from src.data.backends.s3 import S3Backend, _merge_manifests
+
+
+class ConflictingS3(LocalS3):
+    """Lets another writer update a manifest just before our PUT, once."""
+
+    def __init__(self, before_put):
+        super().__init__(latency=0)
+        self.before_put = before_put
+        self.conflicts = 0
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        if Key.endswith("/manifest.json") and self.before_put is not None:
+            before_put, self.before_put = self.before_put, None
+            before_put()
+        try:
+            return super().put_object(Bucket=Bucket, Key=Key, Body=Body, **kwargs)
+        except Exception:
+            self.conflicts += 1
+            raise
+
+
+@pytest.fixture
+def client():
+    return LocalS3(latency=0)
+
+
+def stored_manifest(client, email):
+    body = client.get_object(Bucket="b", Key=f"answers/{email}/manifest.json")
+    return json.loads(body["Body"].read())["questions"]
+
+
+def test_merge_keeps_newest_entry_per_question():
+    remote = {
+        "0": {"etag": "a", "submitted_at": "2024-01-02"},
+        "1": {"etag": "b", "submitted_at": "2024-01-01"},
+    }
+    local = {
+        "0": {"etag": "c", "submitted_at": "2024-01-01"},
+        "1": {"etag": "d", "submitted_at": "2024-01-03"},
+        "2": {"etag": "e", "submitted_at": "2024-01-01"},
+    }
+    merged = _merge_manifests(remote, local)
+    assert {q: meta["etag"] for q, meta in merged.items()} == {
+        "0": "a",
+        "1": "d",
+        "2": "e",
+    }
+
+
+def test_answers_from_two_backends_are_merged(client):
+    first = S3Backend(client=client, bucket="b")
+    second = S3Backend(client=client, bucket="b")
+    first.save_answer("a@x.com", 0, "one", "2024-01-01T00:00:00")
+    first.flush(5)
+    second.save_answer("a@x.com", 1, "two", "2024-01-01T00:00:01")
+    second.flush(5)
+
+    assert sorted(stored_manifest(client, "a@x.com")) == ["0", "1"]
+    fresh = S3Backend(client=client, bucket="b")
+    answers = fresh.get_answer_index("a@x.com")
+    assert {q: record.answer for q, record in answers.items()} == {
+        0: "one",
+        1: "two",
+    }
+
+
+def test_conflicting_manifest_update_is_merged_and_retried():
+    def other_tab_saves():
+        # Another process stores question 1 between our read and our PUT
+        record = {
+            "email": "a@x.com",
+            "question_number": 1,
+            "answer": "theirs",
+            "submitted_at": "2024-01-01T00:00:01",
+        }
+        etag = LocalS3.put_object(
+            client, "b", "answers/a@x.com/q1.json", json.dumps(record)
+        )["ETag"]
+        manifest = {"1": {"submitted_at": record["submitted_at"], "etag": etag}}
+        LocalS3.put_object(
+            client,
+            "b",
+            "answers/a@x.com/manifest.json",
+            json.dumps({"questions": manifest}),
+        )
+
+    client = ConflictingS3(other_tab_saves)
+    backend = S3Backend(client=client, bucket="b")
+    backend.save_answer("a@x.com", 0, "ours", "2024-01-01T00:00:00")
+    assert backend.flush(5)
+
+    assert client.conflicts == 1
+    assert sorted(stored_manifest(client, "a@x.com")) == ["0", "1"]
+    answers = backend.get_answer_index("a@x.com")
+    assert {q: record.answer for q, record in answers.items()} == {
+        0: "ours",
+        1: "theirs",
+    }
+    assert not backend.writer.failed
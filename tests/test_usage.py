@@ -0,0 +1,78 @@
+import json
+import math
+
+from src.data.usage import UsageTracker
+
+
+def interaction(email, n, **fields):
+    record = {
+        "interaction_id": f"{email}-{n}",
+        "email": email,
+        "question_number": 0,
+        "parameters": json.dumps({"model": "gpt-4o-mini"}),
+        "prompt": "p",
+        "response": "r",
+        "timestamp": f"2024-01-01T00:00:{n:02d}",
+        "prompt_tokens": 10,
+        "completion_tokens": 5,
+        "latency_ms": 100.0,
+    }
+    record.update(fields)
+    return record
+
+
+class Log:
+    """Interaction log that counts how often it is read."""
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.loads = 0
+
+    def loader(self, email):
+        def load():
+            self.loads += 1
+            return [r for r in self.records if email is None or r["email"] == email]
+
+        return load
+
+
+def test_aggregates_are_built_once_and_kept_current():
+    log = Log([interaction("a@x.com", 1), interaction("a@x.com", 2)])
+    tracker = UsageTracker(max_entries=2)
+    usage = tracker.get("a@x.com", log.loader("a@x.com"))
+    assert usage.total.calls == 2
+
+    saved = interaction("a@x.com", 3)
+    log.records.append(saved)
+    tracker.record(saved)
+    assert tracker.get("a@x.com", log.loader("a@x.com")).total.calls == 3
+    assert usage.total.prompt_tokens == 30
+    assert log.loads == 1
+
+
+def test_least_recently_used_users_are_evicted_and_rebuilt():
+    log = Log(interaction(email, 1) for email in ("a@x.com", "b@x.com", "c@x.com"))
+    tracker = UsageTracker(max_entries=2)
+    for email in ("a@x.com", "b@x.com", None):
+        tracker.get(email, log.loader(email))
+    # a is used again, so b is the one evicted when c arrives
+    tracker.get("a@x.com", log.loader("a@x.com"))
+    tracker.get("c@x.com", log.loader("c@x.com"))
+    assert log.loads == 4
+
+    tracker.get("a@x.com", log.loader("a@x.com"))
+    tracker.get(None, log.loader(None))
+    assert log.loads == 4
+    # A save while evicted is not lost: the rebuild reads it from the log
+    saved = interaction("b@x.com", 2)
+    log.records.append(saved)
+    tracker.record(saved)
+    assert tracker.get("b@x.com", log.loader("b@x.com")).total.calls == 2
+    assert log.loads == 5
+
+
+def test_missing_telemetry_read_back_as_nan_counts_as_zero():
+    log = Log([interaction("a@x.com", 1, prompt_tokens=math.nan, latency_ms=math.nan)])
+    usage = UsageTracker().get("a@x.com", log.loader("a@x.com"))
+    assert usage.total.calls == 1
+    assert usage.total.prompt_tokens == 0
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from src.data.writer import BackgroundWriter
+
+
+class Store:
+    """A put function that records writes and can be held or made to fail."""
+
+    def __init__(self, failures: int = 0, key: str = "k"):
+        # How many more writes of key fail
+        self.failures = {key: failures}
+        self.writes = []
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+        self._lock = threading.Lock()
+
+    def put(self, key: str, body: bytes) -> str:
+        self.started.set()
+        self.release.wait(5)
+        with self._lock:
+            if self.failures.get(key):
+                self.failures[key] -= 1
+                raise RuntimeError("unavailable")
+            self.writes.append((key, body))
+            return f"etag-{len(self.writes)}"
+
+
+def writer(store: Store, **kwargs) -> BackgroundWriter:
+    options = {"workers": 2, "max_attempts": 3, "backoff_base": 0.001}
+    options.update(kwargs)
+    return BackgroundWriter(store.put, **options)
+
+
+def test_queued_writes_to_a_key_are_coalesced():
+    store = Store()
+    store.release.clear()
+    background = writer(store)
+    background.submit("k", b"1")
+    assert store.started.wait(5)
+    # Written in order: the in-flight body, then only the newest queued one
+    for body in (b"2", b"3", b"4"):
+        background.submit("k", body)
+    assert background.pending("k") == b"4"
+    store.release.set()
+
+    assert background.flush(5)
+    assert store.writes == [("k", b"1"), ("k", b"4")]
+    assert background.pending("k") is None
+
+
+def test_failed_writes_are_retried_with_backoff():
+    store = Store(failures=2)
+    background = writer(store)
+    etags = []
+    background.submit("k", b"body", on_success=etags.append)
+
+    assert background.flush(5)
+    assert store.writes == [("k", b"body")]
+    assert etags == ["etag-1"]
+    assert not background.failed
+
+
+def test_dropped_write_is_not_reported():
+    store = Store(failures=3)
+    background = writer(store)
+    background.submit("k", b"body")
+
+    assert background.flush(5)
+    assert store.writes == []
+    assert not background.failed
+
+
+def test_kept_write_is_parked_and_retried_until_it_lands():
+    store = Store(failures=4, key="answers/a@x.com/q0.json")
+    background = writer(store, retry_seconds=0.05)
+    background.submit("answers/a@x.com/q0.json", b"answer", keep=True)
+    background.submit("answers/b@x.com/q0.json", b"other")
+
+    deadline = time.monotonic() + 5
+    while not background.failed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    failed = background.failed_under("answers/a@x.com/")
+    assert list(failed) == ["answers/a@x.com/q0.json"]
+    assert str(failed["answers/a@x.com/q0.json"]) == "unavailable"
+    assert background.pending("answers/a@x.com/q0.json") == b"answer"
+
+    assert background.flush(5)
+    assert ("answers/a@x.com/q0.json", b"answer") in store.writes
+    assert not background.failed_under("answers/a@x.com/")
+
+
+def test_new_body_for_parked_key_is_written_right_away():
+    store = Store(failures=3)
+    background = writer(store, retry_seconds=60)
+    background.submit("k", b"old", keep=True)
+    deadline = time.monotonic() + 5
+    while not background.failed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert background.failed
+
+    background.submit("k", b"new", keep=True)
+    assert background.flush(5)
+    assert store.writes == [("k", b"new")]
+    assert not background.failed